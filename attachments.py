@@ -0,0 +1,123 @@
+import math
+import mmap
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from request_scheduler import RequestCancelled
+
+INLINE_LIMIT = 32000  # Files up to this size go into the message as they are
+CHUNK_BYTES = 24000  # About 6000 tokens per part, well inside every model's context
+SNIFF_BYTES = 8192
+
+MAP_PROMPT = "This is part {part} of the file {name}. {task}\n\n{text}"
+REDUCE_PROMPT = ("These are notes taken from consecutive parts of the file {name}. {task} "
+                 "Combine them into one concise summary without repeating yourself.\n\n{text}")
+SUMMARY_TASK = "Summarise its key points, keeping the errors, warnings, names, numbers and timestamps that matter."
+EXTRACT_TASK = "Extract everything in it that is relevant to this request: {instruction}"
+
+
+def is_text_file(path):
+    # Binary files (images, archives...) contain NUL bytes near the start; text and logs don't
+    with open(path, "rb") as file:
+        return b"\0" not in file.read(SNIFF_BYTES)
+
+
+def estimate_parts(path, chunk_bytes=CHUNK_BYTES):
+    return max(1, math.ceil(os.path.getsize(path) / chunk_bytes))
+
+
+def iter_chunks(path, chunk_bytes=CHUNK_BYTES):
+    # Memory-maps the file and yields it part by part, cut at line ends, so only one part is in memory
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            while start < size:
+                end = min(size, start + chunk_bytes)
+                if end < size:
+                    cut = data.rfind(b"\n", start, end)
+                    if cut > start:
+                        end = cut + 1
+                    else:
+                        while end > start + 1 and data[end] & 0xC0 == 0x80:
+                            end -= 1  # A line longer than a part: at least don't split a UTF-8 character
+                yield data[start:end].decode("utf-8", errors="replace")
+                start = end
+
+
+class AttachmentSummarizer:
+    # Map-reduce over a large file: each part is summarised (or mined for what the user asked)
+    # concurrently, then the notes are combined until one summary is left.
+    # ask(prompt, cancel_token) -> str sends one prompt to the model.
+    def __init__(self, ask, workers=4, chunk_bytes=CHUNK_BYTES):
+        self.ask = ask
+        self.workers = workers
+        self.chunk_bytes = chunk_bytes
+
+    def summarize(self, path, instruction="", cancel_token=None, progress=None):
+        # progress(done, total) is called from this thread as parts are finished
+        name = os.path.basename(path)
+        task = EXTRACT_TASK.format(instruction=instruction) if instruction else SUMMARY_TASK
+        total = estimate_parts(path, self.chunk_bytes)  # Cutting at line ends can add a part or two
+        prompts = (MAP_PROMPT.format(part=i + 1, name=name, task=task, text=text)
+                   for i, text in enumerate(iter_chunks(path, self.chunk_bytes)))
+        notes = self._run_all(prompts, total, cancel_token, progress)
+        parts = len(notes)
+        while len(notes) > 1:
+            groups = self._group(notes)
+            prompts = (REDUCE_PROMPT.format(name=name, task=task, text="\n\n".join(group)) for group in groups)
+            notes = self._run_all(prompts, len(groups), cancel_token, progress)
+        return notes[0] if notes else "", parts
+
+    def _group(self, notes):
+        # Packs consecutive notes into prompts of at most chunk_bytes; always at least pairs, so it converges
+        groups, current, size = [], [], 0
+        for note in notes:
+            if current and (size + len(note) > self.chunk_bytes and len(current) >= 2):
+                groups.append(current)
+                current, size = [], 0
+            current.append(note)
+            size += len(note)
+        if current:
+            if len(current) == 1 and groups:
+                groups[-1].append(current[0])
+            else:
+                groups.append(current)
+        return groups
+
+    def _run_all(self, prompts, total, cancel_token, progress):
+        # Keeps at most 2 × workers prompts in flight, so parts are read from disk only as they are needed
+        results = {}
+        pending = {}
+
+        def collect(finished):
+            for future in finished:
+                results[pending.pop(future)] = future.result()
+                if progress is not None:
+                    progress(len(results), max(total, len(results) + len(pending)))
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="attachment") as executor:
+            try:
+                for i, prompt in enumerate(prompts):
+                    if cancel_token is not None and cancel_token.cancelled:
+                        raise RequestCancelled()
+                    pending[executor.submit(self.ask, prompt, cancel_token)] = i
+                    if len(pending) >= 2 * self.workers:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(finished)
+                while pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+        return [results[i] for i in sorted(results)]
+
+
+def attachment_prompt(path, summary, parts, instruction=""):
+    # The message that replaces the file: what the user asked (if anything), then the summary
+    text = f"Summary of the attached file {os.path.basename(path)} ({parts} parts):\n{summary}"
+    return f"{instruction}\n\n{text}" if instruction else text
@@ -0,0 +1,216 @@
+"""Headless end-to-end benchmarks of ChatApp against mock_mistral_server.py.
+
+    python benchmark.py                      # with the installed mistralai SDK
+    python benchmark.py --sdk v0             # force the mistralai <= 0.4.2 backend
+    python benchmark.py --json results.json  # also write the numbers for comparing runs
+
+Runs in a temporary directory, so the real chats_history is never touched.
+Exits with status 1 if the first window took longer than chat_app.STARTUP_TARGET_SECONDS.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from chat_store import write_atomic
+from mistral_backend import BACKENDS, SDK_ENV
+from mock_mistral_server import MockMistralServer, MockSettings
+
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {"median_ms": statistics.median(ordered) * 1000,
+            "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+            "max_ms": ordered[-1] * 1000}
+
+
+def make_history(count, content_length=400):
+    text = ("lorem ipsum dolor sit amet " * (content_length // 27 + 1))[:content_length]
+    return [{"role": "user" if i % 2 == 0 else "bot", "content": f"{i} {text}", "timestamp": "2024/01/01-00:00:00"}
+            for i in range(count)]
+
+
+class StallMonitor:
+    # Measures how long the GUI thread was blocked: a fast timer that is late by more than a frame was starved
+    def __init__(self, interval_ms=5, frame_ms=16):
+        from PyQt6.QtCore import QTimer
+        self.interval = interval_ms / 1000
+        self.frame = frame_ms / 1000
+        self._timer = QTimer()
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._tick)
+        self.stalls = []
+
+    def _tick(self):
+        now = time.perf_counter()
+        lateness = now - self._last - self.interval
+        if lateness > self.frame:
+            self.stalls.append(lateness)
+        self._last = now
+
+    def start(self):
+        self.stalls = []
+        self._last = time.perf_counter()
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        return {"stalls": len(self.stalls), "blocked_ms": sum(self.stalls) * 1000,
+                "longest_ms": max(self.stalls, default=0) * 1000}
+
+
+def wait_for(signals, timeout_s):
+    from PyQt6.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    for signal in signals:
+        signal.connect(loop.quit)
+    QTimer.singleShot(int(timeout_s * 1000), loop.quit)
+    loop.exec()
+    for signal in signals:
+        signal.disconnect(loop.quit)
+
+
+def bench_round_trips(app, rounds, stream, timeout_s):
+    # Time to first token (as seen by the GUI thread) and full reply time, with GUI stalls during the requests
+    engine = app.request_engine
+    first_chunk = []
+
+    def on_chunk(request_id, text):
+        if not first_chunk:
+            first_chunk.append(time.perf_counter())
+
+    engine.chunk.connect(on_chunk)
+    app.stream_checkbox.setChecked(stream)
+    ttft, total = [], []
+    monitor = StallMonitor()
+    monitor.start()
+    for i in range(rounds):
+        first_chunk.clear()
+        app.input_field.setPlainText(f"Benchmark message {i}")
+        sent = len(app.session.chat_history)
+        start = time.perf_counter()
+        app.send_message()
+        assert len(app.session.chat_history) > sent, f"benchmark message {i} was not sent"
+        while app.session.busy and time.perf_counter() - start < timeout_s:
+            wait_for([engine.finished, engine.failed, engine.cancelled], timeout_s)  # Also fires for the warm-up
+        end = time.perf_counter()
+        total.append(end - start)
+        ttft.append((first_chunk[0] if first_chunk else end) - start)
+    result = {"ttft": summarize(ttft), "reply": summarize(total), "gui": monitor.stop()}
+    engine.chunk.disconnect(on_chunk)
+    return result
+
+
+def bench_auto_save(app, sizes):
+    # GUI-thread cost of saving one more turn, and the time until it is on disk, for growing chats
+    results = {}
+    for size in sizes:
+        path = os.path.join("chats_history", f"chat_history_bench_save_{size}.jsonl")
+        history = make_history(size)
+        write_atomic(path, history[:-2], fsync=False)
+        app.switch_session(path)
+        app.session.chat_history = history
+        app.session.saved_count = size - 2
+        start = time.perf_counter()
+        app.auto_save_chat_history()
+        queued = time.perf_counter()
+        app.chat_store.flush()
+        written = time.perf_counter()
+        results[size] = {"gui_ms": (queued - start) * 1000, "on_disk_ms": (written - start) * 1000}
+    return results
+
+
+def bench_display(app, qt_app, sizes):
+    # update_chat_display with the whole chat in memory, and open_chat reading a large chat from disk
+    results = {}
+    for size in sizes:
+        app.session.chat_history = make_history(size)
+        app.session.history_offset = 0
+        start = time.perf_counter()
+        app.update_chat_display()
+        qt_app.processEvents()
+        displayed = time.perf_counter() - start
+
+        name = f"chat_history_bench_open_{size}.jsonl"
+        write_atomic(os.path.join("chats_history", name), app.session.chat_history, fsync=False)
+        start = time.perf_counter()
+        app.open_chat(name)
+        qt_app.processEvents()
+        opened = time.perf_counter() - start
+        results[size] = {"update_chat_display_ms": displayed * 1000, "open_chat_ms": opened * 1000}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sdk", choices=sorted(BACKENDS), help="backend to use (default: the installed SDK)")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock server seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--reply-tokens", type=int, default=200)
+    parser.add_argument("--sizes", default="100,1000,10000", help="chat lengths for the save and display runs")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    server = MockMistralServer(settings=MockSettings(args.latency, args.tokens_per_second, args.reply_tokens)).start()
+    os.environ["MISTRAL_BASE_URL"] = server.url  # Read when client_pool is first imported
+    if args.sdk:
+        os.environ[SDK_ENV] = args.sdk
+    workdir = tempfile.mkdtemp(prefix="mistral-chat-bench-")
+    os.chdir(workdir)
+    os.makedirs("chats_history")
+
+    from PyQt6.QtWidgets import QApplication
+    qt_app = QApplication(sys.argv)
+    results = {"workdir": workdir}
+
+    # QtWidgets is already imported here, so this is a little faster than a real launch
+    start = time.perf_counter()
+    import chat_app
+    from mistral_backend import get_backend
+    imported = time.perf_counter()
+    app = chat_app.ChatApp()
+    app.show()
+    while not app.history_loaded and time.perf_counter() - imported < args.timeout:
+        qt_app.processEvents()  # The history scan runs after the first paint
+    ready = time.perf_counter()
+    first_window = app.time_to_first_window if app.time_to_first_window is not None else ready - start
+    results["sdk"] = get_backend().name
+    results["startup"] = {"import_ms": (imported - start) * 1000, "first_window_ms": first_window * 1000,
+                          "history_ready_ms": (ready - start) * 1000,
+                          "target_ms": chat_app.STARTUP_TARGET_SECONDS * 1000,
+                          "within_target": first_window <= chat_app.STARTUP_TARGET_SECONDS}
+
+    app.api_key_combo.setCurrentText("benchmark-key")
+    app.warm_up_connection()  # As when the user finishes typing the key
+    chat_path = os.path.join("chats_history", "chat_history_bench_round_trips.jsonl")
+    app.chat_store.create(chat_path)
+    app.switch_session(chat_path)
+    app.show_session()
+    results["stream"] = bench_round_trips(app, args.rounds, True, args.timeout)
+    results["complete"] = bench_round_trips(app, args.rounds, False, args.timeout)
+    results["requests_served"] = server.requests
+    results["auto_save"] = bench_auto_save(app, sizes)
+    results["display"] = bench_display(app, qt_app, sizes)
+
+    app.close()
+    server.stop()
+
+    print(json.dumps(results, indent=2))
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if not results["startup"]["within_target"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+BLOB_DIR = "blobs"
+BLOB_SUFFIX = ".z"
+CACHE_SIZE = 32  # Decompressed attachments kept in memory; a chat tends to resend the same few
+GRACE_SECONDS = 24 * 60 * 60  # Unreferenced blobs younger than this are kept: attached but not yet saved
+
+
+class BlobStore:
+    # Attachment contents stored once, zlib-compressed, under the SHA-256 of their bytes
+    # (chats_history/blobs/ab/abcdef….z). Messages keep only {"blob", "name", "chars", "bytes"} references.
+    def __init__(self, directory, fsync=True, level=6):
+        self.directory = os.path.join(directory, BLOB_DIR)
+        self.fsync = fsync
+        self.level = level
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + BLOB_SUFFIX)
+
+    def put(self, data):
+        # Returns the digest; storing content that is already there only refreshes its mtime
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            os.utime(path)  # Restarts the grace period, in case the blob is about to be collected
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as file:
+            file.write(zlib.compress(data, self.level))
+            file.flush()
+            if self.fsync:
+                os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        return digest
+
+    def put_file(self, path):
+        # Returns the reference stored in the message
+        with open(path, "rb") as file:
+            data = file.read()
+        text = data.decode("utf-8", errors="replace")
+        return {"blob": self.put(data), "name": os.path.basename(path), "chars": len(text), "bytes": len(data)}
+
+    def put_text(self, text, name):
+        data = text.encode("utf-8", errors="replace")
+        return {"blob": self.put(data), "name": name, "chars": len(text), "bytes": len(data)}
+
+    def get(self, digest):
+        with self._lock:
+            text = self._cache.get(digest)
+            if text is not None:
+                self._cache.move_to_end(digest)
+                return text
+        with open(self.path_for(digest), "rb") as file:
+            text = zlib.decompress(file.read()).decode("utf-8", errors="replace")
+        with self._lock:
+            self._cache[digest] = text
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return text
+
+    def expand(self, content, refs):
+        # The message as the model sees it: what was typed, then each attached file
+        parts = [content] if content else []
+        for ref in refs:
+            try:
+                text = self.get(ref["blob"])
+            except FileNotFoundError:
+                text = "(the file is no longer available)"
+            parts.append(f"Attached file {ref['name']}:\n{text}")
+        return "\n\n".join(parts)
+
+    def collect_garbage(self, chat_paths, grace_seconds=GRACE_SECONDS):
+        # Deletes blobs no chat refers to. Returns (blobs removed, bytes freed), or None if a chat
+        # moved while it was being scanned (e.g. restored from the archive) and it is safer to try later.
+        referenced = find_references(chat_paths)
+        if referenced is None:
+            return None
+        cutoff = time.time() - grace_seconds
+        removed, freed = 0, 0
+        for prefix in os.listdir(self.directory):
+            prefix_dir = os.path.join(self.directory, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if not name.endswith(BLOB_SUFFIX) or name[:-len(BLOB_SUFFIX)] in referenced:
+                    continue
+                path = os.path.join(prefix_dir, name)
+                stat = os.stat(path)
+                if stat.st_mtime >= cutoff:
+                    continue
+                os.remove(path)
+                with self._lock:
+                    self._cache.pop(name[:-len(BLOB_SUFFIX)], None)
+                removed += 1
+                freed += stat.st_size
+        return removed, freed
+
+    def total_size(self):
+        count, size = 0, 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(BLOB_SUFFIX):
+                    count += 1
+                    size += os.path.getsize(os.path.join(root, name))
+        return count, size
+
+
+def find_references(chat_paths):
+    # Digests referenced by the chats at chat_paths (.jsonl, or gzip-compressed in the archive).
+    # Only lines mentioning "attachments" are parsed, so the scan costs little more than reading the files.
+    digests = set()
+    for path in chat_paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            with opener(path, "rb") as file:
+                for line in file:
+                    if b'"attachments"' not in line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    for ref in entry.get("attachments", ()):
+                        digests.add(ref["blob"])
+        except FileNotFoundError:
+            return None
+    return digests
+
+
+def attachment_label(refs):
+    return "\n".join(f"📎 {ref['name']} ({ref['chars']:,} characters)" for ref in refs)
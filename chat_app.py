@@ -0,0 +1,1081 @@
+import glob
+import shutil
+import sys
+import tempfile
+import time
+LAUNCHED = time.perf_counter()  # Time to first window is measured from here, before the Qt imports
+from datetime import datetime
+import os
+from PyQt6.QtWidgets import (
+    QApplication, QMainWindow, QVBoxLayout, QWidget, QLineEdit, QPushButton, QComboBox, QHBoxLayout,
+    QFileDialog, QMessageBox, QLabel, QFormLayout, QListWidget, QListWidgetItem, QListView, QMenu,
+    QDialog, QCheckBox, QSpinBox
+)
+from PyQt6.QtGui import QIcon
+from PyQt6.QtCore import Qt, QTimer, QFileSystemWatcher
+from request_engine import RequestEngine
+from client_pool import ClientPool
+from request_scheduler import RequestScheduler
+from chat_requests import MODELS, DEFAULT_MODEL, DEFAULT_SYSTEM_PROMPT, create_client, get_response, get_stream_response
+from stream_renderer import StreamRenderer
+from transcript_view import TranscriptView, display_content
+from message_composer import MessageComposer
+from context_builder import ContextBuilder, estimate_tokens
+from chat_store import CHAT_PATTERN, ChatStore, import_legacy_chats
+from chat_archive import ARCHIVE_SUFFIX, ChatArchive
+from blob_store import BlobStore, attachment_label
+from chat_session import ChatSession
+from chat_catalog import ChatCatalog
+from search_index import SearchIndex
+from vector_index import VectorIndex, add_memory, available as vector_index_available
+from response_cache import ResponseCache, make_key
+from chat_list_model import ChatListModel, ChatStoreSignals, CHAT_FILE_ROLE, format_size
+from attachments import AttachmentSummarizer, INLINE_LIMIT, attachment_prompt, estimate_parts, is_text_file
+from metrics import Metrics
+from model_fanout import FanOutResult, fan_out, log_fanout
+from comparison_panel import ComparisonPanel, FanOutSignals
+from diagnostics_panel import DiagnosticsDialog
+
+HISTORY_PAGE = 100  # Messages read from disk at a time when opening or scrolling a chat
+STARTUP_TARGET_SECONDS = 1.0  # From launch to the first painted window; checked by benchmark.py
+METRICS_EXPORT_MS = 60000  # metrics.jsonl / metrics.prom in the chats folder are refreshed every minute
+ARCHIVE_CHECK_MS = 6 * 60 * 60 * 1000  # Inactive chats are archived after startup and every 6 hours
+SAVE_RETRY_MS = 30000  # Turns that failed to save are retried this long after the failure (and with the next save)
+MEMORY_SNIPPETS = 4  # Past messages added to the prompt when "Use past chats as memory" is on
+PASTE_BLOB_CHARS = INLINE_LIMIT  # Longer messages are stored like an attached file, not in the chat file
+SEARCH_CATCH_UP_BATCH = 5000  # Messages indexed per writer-thread job while the search index catches up
+VECTOR_CATCH_UP_BATCH = 2000  # Messages embedded per writer-thread job while the vector index catches up
+
+class ChatApp(QMainWindow):
+    def __init__(self):
+        started = time.perf_counter()
+        super().__init__()
+        self.setWindowTitle("Mistral Chat App")
+        self.setGeometry(100, 100, 1200, 800)
+
+        # Create central widget and layout
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QHBoxLayout(central_widget)
+
+        # Chats are append-only JSON Lines files, written by a background thread
+        self.chat_store = ChatStore("chats_history")
+
+        # Latency histograms and usage counters, shown in the diagnostics panel and exported periodically
+        self.metrics = Metrics()
+        self.chat_store.metrics = self.metrics
+        self.diagnostics_dialog = None
+
+        # The sidebar reads titles and stats from a persistent catalog instead of the chat files
+        self.chat_catalog = ChatCatalog("chats_history")
+        self.chat_store.catalog = self.chat_catalog
+
+        # Chats inactive for a month are gzip-compressed into chats_history/archive/ and restored when opened
+        self.chat_archive = ChatArchive("chats_history", self.chat_catalog)
+        self.chat_store.archive = self.chat_archive
+        self.chat_store_signals = ChatStoreSignals(self)
+
+        # Attached files are stored once in chats_history/blobs/; messages only reference them
+        self.blob_store = BlobStore("chats_history")
+        self.pending_attachments = []  # References attached to the next message
+        self.chat_store.on_saved = self.chat_store_signals.chat_saved.emit
+        self.chat_store_signals.indexes_caught_up.connect(self.start_archiving)
+        self.chat_store.on_failed = self.chat_store_signals.job_failed.emit
+        self.chat_store_signals.job_failed.connect(self.on_store_job_failed)
+
+        # Full-text index over every message, updated by each append (and caught up once in the background)
+        self.search_index = SearchIndex("chats_history")
+        self.chat_store.search_index = self.search_index
+
+        # Embeddings of every message for retrieving related past answers; needs NumPy, else memory is off
+        self.vector_index = VectorIndex("chats_history") if vector_index_available() else None
+        self.chat_store.vector_index = self.vector_index
+
+        # Scanning chats_history waits until the window has been painted (see finish_startup);
+        # until then the list shows the catalog as it was at the last exit
+        self.startup_pending = True
+        self.history_loaded = False
+        self.time_to_first_window = None
+
+        # Left pane: All Chats
+        left_pane = QWidget()
+        left_layout = QVBoxLayout(left_pane)
+        left_pane.setMaximumWidth(300)  # Set width to 1/4 of the window
+
+        # Search box; results replace the chat list while a query is entered
+        self.search_field = QLineEdit()
+        self.search_field.setPlaceholderText("Search all chats...")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_field.textChanged.connect(self.search_timer.start)
+        left_layout.addWidget(self.search_field)
+
+        self.search_results = QListWidget()
+        self.search_results.setWordWrap(True)
+        self.search_results.itemDoubleClicked.connect(self.open_search_result)
+        self.search_results.hide()
+        left_layout.addWidget(self.search_results)
+
+        self.all_chats_list = QListView()
+        self.all_chats_list.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)  # Enable horizontal scrolling
+        self.all_chats_list.setUniformItemSizes(True)
+        self.chat_list_model = ChatListModel(self.chat_catalog, self)
+        self.all_chats_list.setModel(self.chat_list_model)
+        self.chat_store_signals.chat_saved.connect(self.chat_list_model.chat_saved)
+        self.all_chats_list.doubleClicked.connect(self.load_selected_chat)
+        left_layout.addWidget(self.all_chats_list)
+
+        # Chats added or removed outside the app are picked up incrementally
+        self.chat_dir_watcher = QFileSystemWatcher(["chats_history"], self)
+        self.chat_dir_sync_timer = QTimer(self)
+        self.chat_dir_sync_timer.setSingleShot(True)
+        self.chat_dir_sync_timer.setInterval(300)
+        self.chat_dir_sync_timer.timeout.connect(self.sync_chat_catalog)
+        self.chat_dir_watcher.directoryChanged.connect(self.chat_dir_sync_timer.start)
+
+        # Delete Chat Button
+        self.delete_chat_button = QPushButton("Delete Chat")
+        self.delete_chat_button.clicked.connect(self.delete_selected_chat)
+        left_layout.addWidget(self.delete_chat_button)
+
+        # New Chat Button
+        self.new_chat_button = QPushButton("New Chat")
+        self.new_chat_button.clicked.connect(self.new_chat)
+        left_layout.addWidget(self.new_chat_button)
+
+        # Diagnostics Button
+        self.diagnostics_button = QPushButton("Diagnostics")
+        self.diagnostics_button.clicked.connect(self.open_diagnostics)
+        left_layout.addWidget(self.diagnostics_button)
+
+        main_layout.addWidget(left_pane)
+
+        # Right pane: Chat Display and Input
+        right_pane = QWidget()
+        right_layout = QVBoxLayout(right_pane)
+
+        # Chat Display
+        self.chat_display = TranscriptView()  # Virtualized: only visible messages are laid out and painted
+        self.chat_display.setObjectName("transcript")
+        self.chat_display.older_requested.connect(self.load_older_messages)
+        self.chat_display.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.chat_display.customContextMenuRequested.connect(self.copy_context_menu)
+        right_layout.addWidget(self.chat_display)
+
+        # Answers of a multi-model send, side by side (hidden until one is sent)
+        self.comparison_panel = ComparisonPanel()
+        self.comparison_panel.preferred.connect(self.record_preference)
+        right_layout.addWidget(self.comparison_panel)
+
+        # User Input
+        self.input_field = MessageComposer()
+        self.input_field.setPlaceholderText("Type your message here... (Shift+Enter for a new line)")
+        self.input_field.submitted.connect(self.send_message)
+        self.input_field.counted.connect(self.show_message_size)
+        right_layout.addWidget(self.input_field)
+
+        # Buttons
+        button_layout = QHBoxLayout()
+        self.attach_file_button = QPushButton(QIcon.fromTheme("document-open"), "Attach File")
+        self.attach_file_button.clicked.connect(self.attach_file)
+        button_layout.addWidget(self.attach_file_button)
+
+        self.message_size_label = QLabel("")
+        button_layout.addWidget(self.message_size_label)
+        self.attachments_label = QLabel("")
+        button_layout.addWidget(self.attachments_label)
+        self.clear_attachments_button = QPushButton("Remove Attachments")
+        self.clear_attachments_button.clicked.connect(self.clear_attachments)
+        self.clear_attachments_button.hide()
+        button_layout.addWidget(self.clear_attachments_button)
+
+        self.send_button = QPushButton(QIcon.fromTheme("mail-send"), "Send")
+        self.send_button.setAutoDefault(False)
+        self.send_button.clicked.connect(self.send_message)
+        button_layout.addWidget(self.send_button)
+
+        self.emoji_button = QPushButton(QIcon.fromTheme("face-smile"), "Emoji")
+        self.emoji_button.clicked.connect(self.open_emoji_dialog)
+        button_layout.addWidget(self.emoji_button)
+
+        # Cancel Button (only visible while a response is generating)
+        self.cancel_button = QPushButton(QIcon.fromTheme("process-stop"), "Cancel")
+        self.cancel_button.clicked.connect(self.cancel_request)
+        self.cancel_button.hide()
+        button_layout.addWidget(self.cancel_button)
+
+        self.status_label = QLabel("")
+        button_layout.addWidget(self.status_label)
+
+        right_layout.addLayout(button_layout)
+        main_layout.addWidget(right_pane)
+
+        # Configuration drop-downs and system prompt
+        config_layout = QFormLayout()
+        self.api_key_combo = QComboBox()
+        self.api_key_combo.setEditable(True)
+        self.api_key_combo.setPlaceholderText("Enter your Mistral API key")
+        config_layout.addRow("API Key:", self.api_key_combo)
+
+        self.model_combo = QComboBox()
+        self.model_combo.addItems(MODELS)
+        self.model_combo.setCurrentText(DEFAULT_MODEL)
+        config_layout.addRow("Model:", self.model_combo)
+
+        self.system_prompt_field = QLineEdit()
+        self.system_prompt_field.setPlaceholderText("Enter system prompt")
+        self.system_prompt_field.setText(DEFAULT_SYSTEM_PROMPT)
+        config_layout.addRow("System Prompt:", self.system_prompt_field)
+
+        self.stream_checkbox = QCheckBox("Show the reply as it is generated")
+        self.stream_checkbox.setChecked(True)
+        config_layout.addRow("Streaming:", self.stream_checkbox)
+
+        # Opt-in reuse of earlier replies to identical requests (model, system prompt and context)
+        self.response_cache = ResponseCache("chats_history")
+        cache_layout = QHBoxLayout()
+        self.cache_checkbox = QCheckBox("Reuse cached replies")
+        self.bypass_cache_checkbox = QCheckBox("Skip cache for the next message")
+        self.offline_checkbox = QCheckBox("Offline (cached replies only)")
+        cache_layout.addWidget(self.cache_checkbox)
+        cache_layout.addWidget(self.bypass_cache_checkbox)
+        cache_layout.addWidget(self.offline_checkbox)
+        config_layout.addRow("Response cache:", cache_layout)
+
+        # The most similar messages from other chats are added to the system prompt
+        self.memory_checkbox = QCheckBox("Use past chats as memory")
+        if self.vector_index is None:
+            self.memory_checkbox.setEnabled(False)
+            self.memory_checkbox.setToolTip("Install NumPy to enable chat memory")
+        config_layout.addRow("Memory:", self.memory_checkbox)
+
+        # Sending to two or more models at once; "Fastest wins" cancels the others when one answers
+        compare_layout = QHBoxLayout()
+        self.compare_checkboxes = {}
+        for model in MODELS:
+            self.compare_checkboxes[model] = QCheckBox(model)
+            compare_layout.addWidget(self.compare_checkboxes[model])
+        self.hedge_checkbox = QCheckBox("Fastest wins")
+        compare_layout.addWidget(self.hedge_checkbox)
+        config_layout.addRow("Compare models:", compare_layout)
+        self.fanout_signals = FanOutSignals(self)
+        self.fanout_signals.chunk.connect(self.comparison_panel.add_chunk)
+        self.fanout_signals.answered.connect(self.comparison_panel.set_answer)
+
+        self.connection_stats_label = QLabel("")
+        config_layout.addRow("Connections:", self.connection_stats_label)
+
+        # Earlier turns are sent newest-first until the model's token budget is used up
+        self.context_builder = ContextBuilder()
+        self.context_builder.blobs = self.blob_store
+        self.context_budget_spin = QSpinBox()
+        self.context_budget_spin.setRange(0, 256000)
+        self.context_budget_spin.setSingleStep(1000)
+        self.context_budget_spin.setSuffix(" tokens")
+        self.context_budget_spin.setValue(self.context_builder.budget_for(self.model_combo.currentText()))
+        self.context_budget_spin.valueChanged.connect(self.set_context_budget)
+        self.model_combo.currentTextChanged.connect(self.on_model_changed)
+        config_layout.addRow("Context budget:", self.context_budget_spin)
+
+        self.prompt_size_label = QLabel("")
+        config_layout.addRow("Prompt size:", self.prompt_size_label)
+
+        right_layout.addLayout(config_layout)
+
+        # Each chat is a session with its own request and queue; self.session is the one on screen
+        self.session = ChatSession()
+        self.sessions = {}  # Chat file -> session, while the chat is on screen or has requests pending
+        self.request_sessions = {}  # Request id -> session the reply belongs to
+
+        # Background request engine (keeps the GUI responsive during API calls)
+        self.request_engine = RequestEngine(self)
+        self.request_engine.chunk.connect(self.on_ai_chunk)
+        self.request_engine.finished.connect(self.on_ai_response)
+        self.request_engine.cancelled.connect(self.on_ai_cancelled)
+        self.request_engine.failed.connect(self.on_ai_failed)
+
+        # Streamed replies are written to the chat display in batches (~30 fps)
+        self.stream_renderer = StreamRenderer(self.chat_display, interval_ms=30, parent=self)
+
+        # One pooled client per API key keeps HTTPS connections alive across turns. The mistralai SDK
+        # (either generation, see mistral_backend) is imported when the first client is built.
+        self.client_pool = ClientPool(create_client)
+        # Rate limit per API key, retries with backoff, and one call for identical requests in flight
+        self.scheduler = RequestScheduler()
+
+        # Large attachments are summarised part by part in the background
+        self.attachment_engine = RequestEngine(self, max_workers=1)
+        self.attachment_engine.chunk.connect(self.on_attachment_progress)
+        self.attachment_engine.finished.connect(self.on_attachment_ready)
+        self.attachment_engine.failed.connect(self.on_attachment_failed)
+        self.attachment_request = None
+        self.attachment_temp_dir = None  # Holds a long paste while it is being summarised
+
+        # Archiving runs in the background; the space it reclaims is shown in the status line
+        self.archive_engine = RequestEngine(self, max_workers=1)
+        self.archive_engine.finished.connect(self.on_archive_done)
+        self.archive_engine.failed.connect(self.on_archive_failed)
+        self.archive_timer = QTimer(self)
+        self.archive_timer.setInterval(ARCHIVE_CHECK_MS)
+        self.archive_timer.timeout.connect(self.archive_inactive_chats)
+
+        # Only a key the user has finished entering is warmed: a partial one would fail and take a pool slot
+        self.warmed_api_key = None
+        self.api_key_combo.activated.connect(self.warm_up_connection)
+        self.api_key_combo.lineEdit().editingFinished.connect(self.warm_up_connection)
+
+        self.prompt_estimate_timer = QTimer(self)
+        self.prompt_estimate_timer.setSingleShot(True)
+        self.prompt_estimate_timer.setInterval(200)
+        self.prompt_estimate_timer.timeout.connect(self.update_prompt_estimate)
+        self.system_prompt_field.textChanged.connect(self.prompt_estimate_timer.start)
+
+        self.metrics_export_timer = QTimer(self)
+        self.metrics_export_timer.setInterval(METRICS_EXPORT_MS)
+        self.metrics_export_timer.timeout.connect(self.export_metrics)
+        self.metrics_export_timer.start()
+
+        self.save_retry_timer = QTimer(self)
+        self.save_retry_timer.setSingleShot(True)
+        self.save_retry_timer.setInterval(SAVE_RETRY_MS)
+        self.save_retry_timer.timeout.connect(self.chat_store.retry_unsaved)
+
+        # Set Stylesheet for Modern Look
+        self.setStyleSheet("""
+            QMainWindow { background-color: #f0f0f0; }
+            QTextEdit { background-color: white; border: 1px solid #ccc; padding: 10px; }
+            QListView#transcript { background-color: white; border: 1px solid #ccc; padding: 10px; }
+            QLineEdit { background-color: white; border: 1px solid #ccc; padding: 10px; }
+            QPlainTextEdit { background-color: white; border: 1px solid #ccc; padding: 10px; }
+            QPushButton { background-color: #007acc; color: white; border: none; padding: 10px; margin: 5px; }
+            QPushButton:hover { background-color: #005a8c; }
+            QListView { background-color: #e0e0e0; border: 1px solid #ccc; padding: 10px; }
+            QListView::item { padding: 5px; }
+            QSplitter::handle { background-color: #ccc; width: 5px; }
+        """)
+        self.metrics.observe("startup_seconds", time.perf_counter() - started)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.startup_pending:
+            self.startup_pending = False
+            self.time_to_first_window = time.perf_counter() - LAUNCHED
+            self.metrics.observe("time_to_first_window_seconds", self.time_to_first_window)
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        # Work that used to run before the window could appear
+        with self.metrics.timer("history_scan_seconds"):
+            _, skipped = import_legacy_chats("chats_history")  # One-time conversion of old .json chats
+            self.load_chat_histories()
+        if skipped:
+            name, error = skipped[0]
+            more = f" and {len(skipped) - 1} more" if len(skipped) > 1 else ""
+            self.status_label.setText(f"Could not import the old chat {name}{more}: {error}")
+        self.chat_store.schedule(self.catch_up_search_index)
+        self.history_loaded = True
+
+    def catch_up_search_index(self):
+        # Runs on the chat store thread a batch at a time, like the vector index after it
+        if self.chat_store.closing:
+            return
+        if self.search_index.catch_up(self.chat_catalog.message_counts(), limit=SEARCH_CATCH_UP_BATCH):
+            self.chat_store.schedule(self.catch_up_search_index)
+        else:
+            self.catch_up_vector_index()
+
+    def catch_up_vector_index(self):
+        # Runs on the chat store thread a batch at a time; reads of a chat wait only for that chat's writes
+        if self.chat_store.closing:
+            return
+        if self.vector_index is not None and self.vector_index.catch_up(
+                self.chat_catalog.message_counts(), limit=VECTOR_CATCH_UP_BATCH):
+            self.chat_store.schedule(self.catch_up_vector_index)
+        else:
+            self.chat_store_signals.indexes_caught_up.emit()
+
+    def start_archiving(self):
+        # Only once the indexes have read every chat: an archived chat is no longer where they look for it
+        self.archive_inactive_chats()
+        self.archive_timer.start()
+
+    def load_chat_histories(self):
+        with self.metrics.timer("load_chat_histories_seconds"):
+            self.chat_catalog.reconcile()  # Only re-reads chat files that are new or changed on disk
+            self.chat_list_model.reload()
+
+    def sync_chat_catalog(self):
+        added, removed, changed = self.chat_catalog.reconcile()
+        for chat_file in removed:
+            self.chat_list_model.chat_removed(chat_file)
+        for chat_file in added + changed:
+            self.chat_list_model.chat_changed(chat_file)
+
+    def load_selected_chat(self, index):
+        self.open_chat(index.data(CHAT_FILE_ROLE))
+
+    def open_chat(self, chat_file, position=None):
+        # Only the newest page (or the page around `position`) is read; older turns load on scroll
+        self.chat_archive.ensure_hot(chat_file)  # An archived chat is decompressed back into chats_history
+        created = self.switch_session(os.path.join("chats_history", chat_file))
+        session = self.session
+        if not created and (position is None or session.busy
+                            or 0 <= position - session.history_start < len(session.chat_history)):
+            # Still open and the message is already in memory. A generating chat keeps its window even
+            # if the message isn't in it: its request appends to the turns loaded now.
+            self.show_session()
+            return
+        if position is None:
+            session.chat_history, session.history_offset = self.chat_store.load_window(session.chat_file, HISTORY_PAGE)
+        else:
+            session.chat_history, session.history_offset = self.chat_store.load_from(
+                session.chat_file, max(0, position - 10))
+        session.history_start = self.chat_store.count_before(session.chat_file, session.history_offset)
+        session.saved_count = len(session.chat_history)
+        self.show_session()
+
+    def switch_session(self, chat_file):
+        # Makes chat_file's session the one on screen; returns True if it had to be created.
+        # Sessions of other chats stay alive only while they have a request in flight or queued.
+        if self.stream_renderer.active:
+            self.stream_renderer.finish()  # The reply keeps streaming into its own session, off screen
+        previous = self.session
+        if previous.chat_file != chat_file and not previous.busy:
+            self.sessions.pop(previous.chat_file, None)
+        session = self.sessions.get(chat_file)
+        created = session is None
+        if created:
+            session = self.sessions[chat_file] = ChatSession(chat_file)
+        self.session = session
+        return created
+
+    def show_session(self):
+        session = self.session
+        self.update_chat_display()
+        if session.pending_request is not None and session.stream_timestamp is not None:
+            # Redraw what has streamed so far; the rest follows token by token
+            self.stream_renderer.begin("AI", session.stream_timestamp)
+            self.stream_renderer.feed("".join(session.stream_parts))
+        self.update_session_controls()
+        self.update_prompt_estimate()
+
+    def load_older_messages(self):
+        session = self.session
+        if not session.chat_file or session.history_offset == 0:
+            return
+        older, session.history_offset = self.chat_store.load_window(
+            session.chat_file, HISTORY_PAGE, end=session.history_offset)
+        session.chat_history = older + session.chat_history  # New list, so the context builder recounts once
+        session.saved_count += len(older)
+        session.history_start -= len(older)
+        self.chat_display.prepend_messages(older, session.history_offset > 0)
+
+    def run_search(self):
+        query = self.search_field.text().strip()
+        self.search_results.clear()
+        self.search_results.setVisible(bool(query))
+        self.all_chats_list.setVisible(not query)
+        if not query:
+            return
+        for chat_file, position, role, snippet in self.search_index.search(query):
+            row = self.chat_catalog.get(chat_file)
+            title = row[1] if row and row[1] else chat_file
+            item = QListWidgetItem(f"{title}\n{snippet}")
+            item.setData(Qt.ItemDataRole.UserRole, (chat_file, position))
+            self.search_results.addItem(item)
+
+    def open_search_result(self, item):
+        chat_file, position = item.data(Qt.ItemDataRole.UserRole)
+        self.open_chat(chat_file, position)
+        self.scroll_to_message(position)
+
+    def scroll_to_message(self, position):
+        self.chat_display.scroll_to_row(position - self.session.history_start)
+
+    def new_chat(self):
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        chat_path = os.path.join("chats_history", f"chat_history_{timestamp}.jsonl")
+        self.chat_store.create(chat_path)  # Create the new chat file
+        self.switch_session(chat_path)
+        self.show_session()
+        self.select_chat_in_list(chat_path)
+        QMessageBox.information(self, "New Chat", "A new chat has been created.")  # Feedback
+
+    def delete_selected_chat(self):
+        selected_index = self.all_chats_list.currentIndex()
+        if selected_index.isValid():
+            confirm = QMessageBox.question(self, "Delete Chat", "Are you sure you want to delete this chat?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if confirm == QMessageBox.StandardButton.Yes:
+                chat_file = selected_index.data(CHAT_FILE_ROLE)
+                self.close_session(os.path.join("chats_history", chat_file))
+                self.chat_store.delete(os.path.join("chats_history", chat_file))
+                self.chat_list_model.chat_removed(chat_file)
+
+    def close_session(self, chat_file):
+        # Drops a chat's session (cancelling its requests); a blank one is shown if it was on screen
+        session = self.sessions.pop(chat_file, None)
+        if session is None:
+            return
+        session.queue.clear()
+        if session.pending_request is not None:
+            self.request_engine.cancel(session.pending_request)
+        session.chat_file = None  # Nothing more is saved for it
+        if session is self.session:
+            self.session = ChatSession()
+            self.show_session()
+
+    def select_chat_in_list(self, chat_path):
+        chat_file = os.path.basename(chat_path)
+        self.chat_list_model.chat_added(chat_file)
+        self.all_chats_list.setCurrentIndex(self.chat_list_model.index_of(chat_file))
+
+    def update_chat_display(self):
+        with self.metrics.timer("update_chat_display_seconds"):
+            self.chat_display.set_messages(self.session.chat_history, has_older=self.session.history_offset > 0)
+
+    def send_message(self):
+        session = self.session
+        if not session.chat_file:
+            QMessageBox.warning(self, "Error", "Please select a chat history or create a new chat.")
+            return
+
+        user_message = self.input_field.toPlainText().strip()  # Remove leading/trailing whitespace
+        if not user_message and not self.pending_attachments:
+            QMessageBox.warning(self, "Error", "Message cannot be empty.")
+            return
+        attachments = list(self.pending_attachments)
+        models = [self.model_combo.currentText()] + [
+            model for model, checkbox in self.compare_checkboxes.items() if checkbox.isChecked()]
+        if (len(user_message) > PASTE_BLOB_CHARS
+                and estimate_tokens(user_message) > min(map(self.context_builder.budget_for, models))):
+            # More than the model can take: summarised like a large file, then sent
+            if self.attachment_request is not None:
+                QMessageBox.information(self, "Attach File", "Please wait for the attachment being summarised.")
+            else:
+                self.summarize_paste(user_message)
+            return
+        if len(user_message) > PASTE_BLOB_CHARS:
+            # A huge paste goes to the blob store like an attached file; the chat and transcript keep a reference
+            attachments.append(self.blob_store.put_text(user_message, "pasted-text.txt"))
+            user_message = ""
+
+        offline = self.offline_checkbox.isChecked()
+        api_key = self.api_key_combo.currentText()
+        if not api_key and not offline:
+            QMessageBox.warning(self, "Error", "Please enter a valid API key.")
+            return
+
+        # Settings are captured now; the message is sent once the chat's earlier requests are done
+        compared = [model for model, checkbox in self.compare_checkboxes.items() if checkbox.isChecked()]
+        request = {
+            "content": user_message,
+            "api_key": api_key,
+            "model": self.model_combo.currentText(),
+            "system_prompt": self.system_prompt_field.text(),
+            "stream": self.stream_checkbox.isChecked(),
+            "use_cache": (self.cache_checkbox.isChecked() or offline) and not self.bypass_cache_checkbox.isChecked(),
+            "offline": offline,
+            "models": compared if len(compared) > 1 and not offline else [],  # Offline: cached replies only
+            "hedge": self.hedge_checkbox.isChecked(),
+            "memory": self.memory_checkbox.isChecked(),
+            "attachments": attachments,
+        }
+        self.bypass_cache_checkbox.setChecked(False)  # The bypass applies to one message
+        if session.busy:
+            session.queue.append(request)
+            self.input_field.clear()
+            self.clear_attachments()
+            self.update_activity(session)
+            return
+        if not self.dispatch(session, request):
+            QMessageBox.information(self, "Offline", "There is no cached reply for this message.")
+            return
+        self.input_field.clear()
+        self.clear_attachments()
+        self.run_queue(session)
+
+    def dispatch(self, session, request):
+        # Adds the message to its chat and starts its request; the context is built now, so it includes
+        # the replies to messages queued before it. Returns False if offline and there is no cached reply.
+        model = request["model"]
+        # A multi-model send gets the context that fits the smallest budget among its models
+        context_model = min(request["models"], key=self.context_builder.budget_for) if request["models"] else model
+        messages = self.context_builder.build(
+            session.chat_history, request["system_prompt"], request["content"], context_model, request["attachments"])
+        if request["memory"] and self.vector_index is not None:
+            with self.metrics.timer("memory_search_seconds"):
+                hits = self.vector_index.search(request["content"], MEMORY_SNIPPETS,
+                                                exclude_chat=os.path.basename(session.chat_file))
+            messages = add_memory(messages, hits)
+        cache_key = make_key(model, messages) if request["use_cache"] and not request["models"] else None
+        cached = self.response_cache.get(cache_key, allow_expired=request["offline"]) if cache_key else None
+        if cached is None and request["offline"]:
+            return False
+
+        timestamp = datetime.now().strftime("%Y/%m/%d-%H:%M:%S")
+        entry = {"role": "user", "content": request["content"], "timestamp": timestamp}
+        if request["attachments"]:
+            entry["attachments"] = request["attachments"]
+        session.chat_history.append(entry)
+        if session is self.session:
+            self.add_message_to_chat_display("You", display_content(entry), timestamp)
+        if cached is not None:
+            self.metrics.count("cache_hits_total", model=model)
+            self.add_reply(session, cached, cached=True)
+            return True
+
+        api_key = request["api_key"]
+        if request["models"]:
+            # Tokens stream into the comparison panel; the chosen answer is added to the chat when all are done
+            self.comparison_panel.start(request, request["models"], request["hedge"])
+            request_id = self.request_engine.submit(
+                lambda token: self.get_fanout_response(messages, api_key, request, token))
+        elif request["stream"]:
+            session.stream_timestamp = timestamp
+            session.stream_parts = []
+            if session is self.session:
+                self.stream_renderer.begin("AI", timestamp)
+            request_id = self.request_engine.submit(
+                lambda token: self.get_ai_stream_response(messages, api_key, model, token, cache_key))
+        else:
+            request_id = self.request_engine.submit(
+                lambda token: self.get_ai_response(messages, api_key, model, token, cache_key))
+        session.pending_request = request_id
+        self.request_sessions[request_id] = session
+        return True
+
+    def run_queue(self, session):
+        # Sends the session's queued messages in order until one has to wait for the API
+        while session.pending_request is None and session.queue:
+            if not self.dispatch(session, session.queue.popleft()):
+                self.status_label.setText("A queued message was skipped: no cached reply (offline)")
+        self.update_activity(session)
+
+    def add_reply(self, session, response, timestamp=None, cached=False, model=None):
+        timestamp = timestamp or datetime.now().strftime("%Y/%m/%d-%H:%M:%S")
+        entry = {"role": "bot", "content": response, "timestamp": timestamp}
+        if cached:
+            entry["cached"] = True
+        if model is not None:
+            entry["model"] = model  # Picked from a multi-model send
+        session.chat_history.append(entry)
+        if session is self.session:
+            self.add_message_to_chat_display("AI", response, timestamp, cached)
+            if cached:
+                self.status_label.setText("Answered from cache")
+        self.auto_save_chat_history(session)
+        if session is self.session:
+            self.update_prompt_estimate()
+
+    def on_ai_response(self, request_id, response):
+        session = self.request_sessions.pop(request_id, None)
+        if session is None:
+            return  # Cancelled, or not a chat request (e.g. the connection warm-up)
+        session.pending_request = None
+        streamed = "".join(session.stream_parts)
+        if session is self.session and self.stream_renderer.active:
+            self.stream_renderer.finish()
+        if streamed:
+            # Already rendered token by token (if the chat was on screen)
+            session.chat_history.append({"role": "bot", "content": response, "timestamp": session.stream_timestamp})
+            self.auto_save_chat_history(session)
+            if session is self.session:
+                self.update_prompt_estimate()
+        elif isinstance(response, FanOutResult):
+            self.add_fanout_reply(session, response)
+        else:
+            self.add_reply(session, response)
+        session.stream_timestamp = None
+        session.stream_parts = []
+        self.run_queue(session)
+
+    def on_ai_chunk(self, request_id, text):
+        session = self.request_sessions.get(request_id)
+        if session is None:
+            return
+        session.stream_parts.append(text)
+        if session is self.session:
+            self.stream_renderer.feed(text)
+
+    def on_ai_failed(self, request_id, error):
+        session = self.request_sessions.get(request_id)
+        if session is None:
+            return
+        message = f"Sorry, I encountered an error: {error}. Please check your API key and internet connection."
+        if session.stream_timestamp is not None:
+            # Keep any partial reply and show the error after it
+            self.on_ai_chunk(request_id, message)
+            message = "".join(session.stream_parts)
+        self.on_ai_response(request_id, message)
+
+    def on_ai_cancelled(self, request_id):
+        session = self.request_sessions.pop(request_id, None)
+        if session is None:
+            return
+        session.pending_request = None
+        if session is self.session and self.stream_renderer.active:
+            self.stream_renderer.finish()
+        partial = "".join(session.stream_parts)
+        if partial:
+            session.chat_history.append({"role": "bot", "content": partial, "timestamp": session.stream_timestamp})
+        session.stream_timestamp = None
+        session.stream_parts = []
+        self.auto_save_chat_history(session)  # Keep the user's message
+        self.run_queue(session)
+        if session is self.session:
+            self.status_label.setText("Request cancelled")
+
+    def cancel_request(self):
+        # Stops the chat on screen: its request in flight and the messages queued behind it
+        session = self.session
+        session.queue.clear()
+        if session.pending_request is not None:
+            self.request_engine.cancel(session.pending_request)
+        self.update_activity(session)
+
+    def update_activity(self, session):
+        if session.chat_file is not None:
+            self.chat_list_model.set_activity(os.path.basename(session.chat_file), session.activity())
+        if session is self.session:
+            self.update_session_controls()
+        elif not session.busy:
+            self.sessions.pop(session.chat_file, None)  # Done off screen: reopening it reads the file again
+
+    def update_session_controls(self):
+        session = self.session
+        self.cancel_button.setVisible(session.busy)
+        if session.pending_request is not None:
+            queued = f" ({len(session.queue)} queued)" if session.queue else ""
+            self.status_label.setText(f"Generating…{queued}")
+        else:
+            if self.status_label.text().startswith("Generating"):
+                self.status_label.setText("")  # Notes such as "Answered from cache" stay until the next request
+            self.update_connection_stats()
+
+    def on_model_changed(self, model):
+        self.context_budget_spin.setValue(self.context_builder.budget_for(model))
+        self.update_prompt_estimate()
+
+    def set_context_budget(self, tokens):
+        self.context_builder.set_budget(self.model_combo.currentText(), tokens)
+        self.prompt_estimate_timer.start()
+
+    def show_message_size(self, chars):
+        self.message_size_label.setText(f"{chars:,} characters, ~{(chars + 3) // 4:,} tokens" if chars else "")
+        self.update_prompt_estimate()
+
+    def update_prompt_estimate(self):
+        tokens, turns = self.context_builder.estimate(
+            self.session.chat_history, self.system_prompt_field.text(), self.input_field.character_count(),
+            self.model_combo.currentText(), self.pending_attachments)
+        self.prompt_size_label.setText(f"~{tokens} tokens ({turns} earlier messages)")
+
+    def update_connection_stats(self):
+        stats = self.client_pool.stats.snapshot()
+        scheduled = self.scheduler.stats.snapshot()
+        self.connection_stats_label.setText(
+            f"{stats['connections_opened']} opened for {stats['requests_sent']} requests, "
+            f"{scheduled['retries']} retries, {scheduled['coalesced']} shared, "
+            f"{scheduled['wait_seconds']:.1f} s waiting for the rate limit")
+
+    def warm_up_connection(self):
+        api_key = self.api_key_combo.currentText()
+        if api_key and api_key != self.warmed_api_key:
+            self.warmed_api_key = api_key
+            self.request_engine.submit(lambda token: self.client_pool.warm(api_key))
+
+    def get_ai_response(self, messages, api_key, model, cancel_token, cache_key=None):
+        # Runs on a worker thread of the request engine
+        report = {}
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            content = self.metrics.run(lambda: get_response(
+                self.client_pool, messages, api_key, model, cancel_token, self.scheduler, report), "chats_history")
+            outcome = "ok"
+            if cache_key is not None:
+                self.response_cache.put(cache_key, model, content)
+            return content
+        except Exception as e:
+            if cancel_token.cancelled:
+                outcome = "cancelled"  # Cutting the connection surfaces as a read error
+            return f"Sorry, I encountered an error: {str(e)}. Please check your API key and internet connection."
+        finally:
+            self.metrics.record_request(model, False, started, report, outcome)
+
+    def get_ai_stream_response(self, messages, api_key, model, cancel_token, cache_key=None):
+        # Runs on a worker thread; each token is published to the GUI as it arrives
+        parts = []
+        report = {}
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            self.metrics.run(lambda: get_stream_response(
+                self.client_pool, messages, api_key, model, cancel_token, parts, self.scheduler, report),
+                "chats_history")
+            outcome = "cancelled" if cancel_token.cancelled else "ok"
+            if cache_key is not None and not cancel_token.cancelled:
+                self.response_cache.put(cache_key, model, "".join(parts))  # Only complete replies are cached
+        except Exception as e:
+            if cancel_token.cancelled:
+                outcome = "cancelled"  # Cutting the connection mid-stream surfaces as a read error
+                return "".join(parts)
+            error = f"Sorry, I encountered an error: {str(e)}. Please check your API key and internet connection."
+            parts.append(error)
+            cancel_token.publish(error)
+        finally:
+            self.metrics.record_request(model, True, started, report, outcome)
+        return "".join(parts)
+
+    def get_fanout_response(self, messages, api_key, request, cancel_token):
+        # Runs on a worker thread; every model gets a request (and a thread) of its own
+        stream = request["stream"]
+        started = time.perf_counter()
+
+        def ask(model, token, report):
+            if stream:
+                return get_stream_response(
+                    self.client_pool, messages, api_key, model, token, None, self.scheduler, report)
+            return get_response(self.client_pool, messages, api_key, model, token, self.scheduler, report)
+
+        def on_answer(answer):
+            self.metrics.record_request(answer.model, stream, started, answer.report, answer.status)
+            self.fanout_signals.answered.emit(request, answer)
+
+        result = fan_out(ask, request["models"], cancel_token, request["hedge"], request["model"],
+                         lambda model, text: self.fanout_signals.chunk.emit(request, model, text), on_answer)
+        self.chat_store.schedule(lambda: log_fanout("chats_history", result.log_record()), "log the fan-out")
+        return result
+
+    def add_fanout_reply(self, session, result):
+        answer = result.reply()
+        if answer is None:
+            errors = "; ".join(f"{a.model}: {a.error or a.status}" for a in result.answers)
+            self.add_reply(session, f"Sorry, I encountered an error: {errors}. "
+                                    "Please check your API key and internet connection.")
+            return
+        self.add_reply(session, answer.text, model=answer.model)
+        if session is self.session:
+            self.status_label.setText(f"Reply from {answer.model} ({answer.latency:.2f} s)")
+
+    def record_preference(self, model):
+        record = {"time": time.time(), "preferred": model, "models": self.comparison_panel.models}
+        self.chat_store.schedule(lambda: log_fanout("chats_history", record), "log the preference")
+        self.status_label.setText(f"Preferred {model}: saved to fanout.jsonl")
+
+    def add_message_to_chat_display(self, sender, message, timestamp, cached=False):
+        self.chat_display.append_message(sender, message, timestamp, cached)  # Auto-scrolls when at the bottom
+
+    def attach_file(self):
+        if self.attachment_request is not None:
+            self.attachment_engine.cancel(self.attachment_request)  # The button reads "Cancel Attachment"
+            self.finish_attachment("Attachment cancelled")
+            return
+        file_name, _ = QFileDialog.getOpenFileName(
+            self, "Attach File", "", "Text and Log Files (*.txt *.log);;All Files (*)")
+        if not file_name:
+            return
+        if not is_text_file(file_name):
+            QMessageBox.warning(self, "Error", "Only text files are supported.")
+            return
+        file_size = os.path.getsize(file_name)
+        if file_size <= INLINE_LIMIT:
+            # Sent whole with the next message; the chat stores a reference to the blob, not the text
+            self.pending_attachments.append(self.blob_store.put_file(file_name))
+            self.show_attachments()
+            return
+
+        # Too large to send as it is: summarise it part by part (one request per part) into the message
+        if self.confirm_summary(file_name, f"{os.path.basename(file_name)} is {format_size(file_size)}",
+                                "Whatever is in the message field is used as the question. "):
+            self.summarize_file(file_name, self.input_field.toPlainText().strip())
+
+    def summarize_paste(self, text):
+        # A paste longer than the model's context is written to a temporary file and summarised from there
+        temp_dir = tempfile.mkdtemp(prefix="paste-")
+        path = os.path.join(temp_dir, "pasted-text.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        if not self.confirm_summary(path, f"The message is {len(text):,} characters, more than the model can take"):
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return
+        self.attachment_temp_dir = temp_dir
+        self.summarize_file(path)
+
+    def confirm_summary(self, file_name, what, note=""):
+        if not self.api_key_combo.currentText():
+            QMessageBox.warning(self, "Error", "Please enter a valid API key.")
+            return False
+        confirm = QMessageBox.question(
+            self, "Attach File",
+            f"{what}. It will be summarised in about {estimate_parts(file_name)} parts, one API request each. "
+            f"{note}Continue?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        return confirm == QMessageBox.StandardButton.Yes
+
+    def summarize_file(self, file_name, instruction=""):
+        api_key = self.api_key_combo.currentText()
+        model = self.model_combo.currentText()
+        summarizer = AttachmentSummarizer(lambda prompt, token: get_response(
+            self.client_pool, [{"role": "user", "content": prompt}], api_key, model, token, self.scheduler))
+        name = os.path.basename(file_name)
+
+        def summarize(token):
+            # Runs on the attachment engine's thread; the parts are sent from a pool of its own
+            summary, count = summarizer.summarize(
+                file_name, instruction, token,
+                progress=lambda done, total: token.publish(f"Summarising {name}: {done} of {total}"))
+            return attachment_prompt(file_name, summary, count, instruction)
+
+        self.attachment_request = self.attachment_engine.submit(summarize)
+        self.attach_file_button.setText("Cancel Attachment")
+        self.status_label.setText(f"Summarising {name}…")
+
+    def on_attachment_progress(self, request_id, text):
+        if request_id == self.attachment_request:
+            self.status_label.setText(text)
+
+    def on_attachment_ready(self, request_id, prompt):
+        if request_id == self.attachment_request:
+            self.finish_attachment("Attachment summarised")
+            self.input_field.setPlainText(prompt)
+
+    def on_attachment_failed(self, request_id, error):
+        if request_id == self.attachment_request:
+            self.finish_attachment("")
+            QMessageBox.warning(self, "Error", f"Could not summarise the attachment: {error}")
+
+    def show_attachments(self):
+        self.attachments_label.setText(attachment_label(self.pending_attachments))
+        self.clear_attachments_button.setVisible(bool(self.pending_attachments))
+        self.update_prompt_estimate()
+
+    def clear_attachments(self):
+        self.pending_attachments = []
+        self.show_attachments()
+
+    def finish_attachment(self, status):
+        self.attachment_request = None
+        self.attach_file_button.setText("Attach File")
+        if self.attachment_temp_dir is not None:
+            shutil.rmtree(self.attachment_temp_dir, ignore_errors=True)
+            self.attachment_temp_dir = None
+        self.status_label.setText(status)
+
+    def open_emoji_dialog(self):
+        emojis = ["😊", "😢", "😄", "😍", "🤔", "😎", "😂", "😢", "😭", "👏", "👍", "👎", "❤", "💔", "🎉", "🎁", "🎈", "🔑", "🔒", "🔓"]
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Select Emoji")
+        dialog_layout = QVBoxLayout(dialog)
+
+        emoji_list = QListWidget()
+        emoji_list.addItems(emojis)
+        dialog_layout.addWidget(emoji_list)
+
+        button_layout = QHBoxLayout()
+        add_button = QPushButton("Add")
+        add_button.clicked.connect(lambda: self.add_selected_emoji(emoji_list))
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(dialog.close)
+        button_layout.addWidget(add_button)
+        button_layout.addWidget(close_button)
+        dialog_layout.addLayout(button_layout)
+
+        dialog.exec()
+
+    def add_selected_emoji(self, emoji_list):
+        selected_items = emoji_list.selectedItems()
+        if selected_items:
+            emoji = selected_items[0].text()
+            self.input_field.insertPlainText(emoji)
+            QMessageBox.information(self, "Emoji Added", f"Emoji '{emoji}' has been added to your message.")  # Feedback
+
+    def copy_context_menu(self, position):
+        menu = QMenu(self)
+        menu.addAction(self.chat_display.copy_action)
+        menu.exec(self.chat_display.mapToGlobal(position))
+
+    def auto_save_chat_history(self, session=None):
+        session = session or self.session
+        if session.chat_file is None:
+            return  # Deleted while its request was in flight
+        # Only the turns added since the last save are appended (in the background)
+        with self.metrics.timer("auto_save_seconds"):
+            self.chat_store.append(session.chat_file, session.chat_history[session.saved_count:])
+        session.saved_count = len(session.chat_history)
+
+    def open_diagnostics(self):
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self.metrics, self.export_metrics, self)
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+
+    def export_metrics(self):
+        # Written by the chat store's background thread, like the chats themselves
+        self.chat_store.schedule(lambda: self.metrics.export("chats_history"), "export metrics")
+        return "chats_history"
+
+    def archive_inactive_chats(self):
+        keep = {os.path.basename(chat_file) for chat_file in self.sessions if chat_file}  # Open chats stay hot
+        self.archive_engine.submit(lambda token: self.archive_and_collect(keep, token))
+
+    def archive_and_collect(self, keep, token):
+        # Runs on the archive engine's thread: archives inactive chats, then deletes attachment blobs that
+        # no chat (hot or archived) refers to any more
+        report = self.chat_archive.archive_inactive(keep, token)
+        if not token.cancelled:
+            paths = (glob.glob(os.path.join("chats_history", CHAT_PATTERN))
+                     + glob.glob(os.path.join(self.chat_archive.archive_dir, CHAT_PATTERN + ARCHIVE_SUFFIX)))
+            report.blobs = self.blob_store.collect_garbage(paths)
+        return report
+
+    def on_archive_done(self, request_id, report):
+        if report.blobs and report.blobs[0]:
+            self.metrics.count("attachment_blobs_collected_total", report.blobs[0])
+        if not report.chats and not report.backups:
+            return
+        self.metrics.count("archive_reclaimed_bytes_total", report.reclaimed_bytes)
+        chats, original_bytes, archived_bytes = self.chat_catalog.archive_totals()
+        self.status_label.setText(
+            f"Archived {report.chats} inactive chats, {format_size(report.reclaimed_bytes)} reclaimed "
+            f"(archive: {chats} chats, {format_size(original_bytes)} → {format_size(archived_bytes)})")
+
+    def on_store_job_failed(self, description, error):
+        if self.chat_store.has_unsaved():
+            self.status_label.setText(f"Failed to {description}: {error}. The turns are kept and saved again shortly.")
+            self.save_retry_timer.start()
+        else:
+            self.status_label.setText(f"Failed to {description}: {error}")
+
+    def on_archive_failed(self, request_id, error):
+        self.status_label.setText(f"Archiving inactive chats failed: {error}")
+
+    def closeEvent(self, event):
+        self.request_engine.shutdown()
+        self.attachment_engine.shutdown()
+        if self.attachment_temp_dir is not None:
+            shutil.rmtree(self.attachment_temp_dir, ignore_errors=True)
+        self.archive_engine.shutdown()
+        self.client_pool.close_all()
+        self.export_metrics()
+        if self.chat_store.has_unsaved():
+            self.chat_store.retry_unsaved()  # A last try for turns whose save failed
+        self.chat_store.close()
+        self.chat_catalog.close()
+        self.search_index.close()
+        if self.vector_index is not None:
+            self.vector_index.close()
+        self.response_cache.close()
+        super().closeEvent(event)
+
+def main():
+    app = QApplication(sys.argv)
+    chat_app = ChatApp()
+    chat_app.show()
+    sys.exit(app.exec())
+
+if __name__ == "__main__":
+    main()
+
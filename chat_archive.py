@@ -0,0 +1,180 @@
+import fnmatch
+import gzip
+import os
+import shutil
+import threading
+import time
+
+from chat_store import CHAT_PATTERN, LEGACY_BACKUP_DIR
+
+ARCHIVE_DIR = "archive"
+ARCHIVE_SUFFIX = ".gz"
+ARCHIVE_AFTER_DAYS = 30  # Chats not opened or written to for this long move to the archive tier
+ARCHIVE_BATCH = 20  # Chats compressed per catalog update
+COPY_BLOCK = 1024 * 1024
+
+
+class ArchiveReport:
+    def __init__(self):
+        self.chats = 0
+        self.backups = 0  # Pretty-printed legacy_json/ originals compressed in place
+        self.original_bytes = 0
+        self.archived_bytes = 0
+        self.blobs = None  # (removed, bytes freed) when unreferenced attachment blobs were collected as well
+
+    def add(self, original_bytes, archived_bytes, backup=False):
+        if backup:
+            self.backups += 1
+        else:
+            self.chats += 1
+        self.original_bytes += original_bytes
+        self.archived_bytes += archived_bytes
+
+    @property
+    def reclaimed_bytes(self):
+        return self.original_bytes - self.archived_bytes
+
+
+def _compress(source_path, target_path, stat, level):
+    # gzip to a temporary file, synced before the rename so the original can be removed safely
+    tmp_path = target_path + ".tmp"
+    with open(source_path, "rb") as source, open(tmp_path, "wb") as target:
+        with gzip.GzipFile(filename=os.path.basename(source_path), mode="wb", compresslevel=level,
+                           fileobj=target, mtime=stat.st_mtime) as compressed:
+            shutil.copyfileobj(source, compressed, COPY_BLOCK)
+        target.flush()
+        os.fsync(target.fileno())
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp_path, target_path)
+    return os.path.getsize(target_path)
+
+
+def chat_files(directory, pattern=CHAT_PATTERN):
+    # [(name, path)] of every chat, hot or archived, for the indexes' catch-up scans.
+    # The archive is listed first: a chat being restored has its hot copy written before the archive goes.
+    files = {}
+    archive_dir = os.path.join(directory, ARCHIVE_DIR)
+    if os.path.isdir(archive_dir):
+        for name in os.listdir(archive_dir):
+            if name.endswith(ARCHIVE_SUFFIX) and fnmatch.fnmatch(name[:-len(ARCHIVE_SUFFIX)], pattern):
+                files[name[:-len(ARCHIVE_SUFFIX)]] = os.path.join(archive_dir, name)
+    for name in os.listdir(directory):
+        if fnmatch.fnmatch(name, pattern):
+            files[name] = os.path.join(directory, name)
+    return sorted(files.items())
+
+
+def open_chat_file(path):
+    # Text-mode reader for a chat path from chat_files
+    if path.endswith(ARCHIVE_SUFFIX):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+class ChatArchive:
+    # Cold tier for chats nobody has opened or written to for a while: they are gzip-compressed into
+    # chats_history/archive/ in batches, stay in the catalog (and so in the sidebar), and are
+    # decompressed back into chats_history when opened.
+    def __init__(self, directory, catalog=None, after_days=ARCHIVE_AFTER_DAYS, batch=ARCHIVE_BATCH, level=6):
+        self.directory = directory
+        self.archive_dir = os.path.join(directory, ARCHIVE_DIR)
+        self.catalog = catalog
+        self.after_days = after_days
+        self.batch = batch
+        self.level = level
+        self._lock = threading.Lock()
+        self._pinned = set()  # Chats opened during this run; never archived under an open session
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+    def archive_path(self, name):
+        return os.path.join(self.archive_dir, name + ARCHIVE_SUFFIX)
+
+    def is_archived(self, name):
+        return os.path.exists(self.archive_path(name))
+
+    def ensure_hot(self, name):
+        # Called before a chat is opened: restores it if it was archived. Returns True if it was.
+        with self._lock:
+            self._pinned.add(name)
+            archive_path = self.archive_path(name)
+            if not os.path.exists(archive_path):
+                return False
+            stat = os.stat(archive_path)
+            path = os.path.join(self.directory, name)
+            with gzip.open(archive_path, "rb") as source, open(path + ".tmp", "wb") as target:
+                shutil.copyfileobj(source, target, COPY_BLOCK)
+            # Same mtime as before archiving, so the catalog sees an unchanged file
+            os.utime(path + ".tmp", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(path + ".tmp", path)
+            if self.catalog is not None:
+                self.catalog.set_archived({name: 0})
+            os.remove(archive_path)
+            return True
+
+    def discard(self, name):
+        # Removes the compressed copy of a deleted chat
+        with self._lock:
+            self._pinned.discard(name)
+            try:
+                os.remove(self.archive_path(name))
+            except FileNotFoundError:
+                pass
+
+    def candidates(self, keep=()):
+        cutoff = time.time() - self.after_days * 86400
+        names = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if (entry.is_file() and fnmatch.fnmatch(entry.name, CHAT_PATTERN) and entry.name not in keep
+                        and entry.stat().st_mtime < cutoff):
+                    names.append(entry.name)
+        return sorted(names)
+
+    def archive_inactive(self, keep=(), cancel_token=None):
+        # Runs on a background thread. `keep` holds the chats that have sessions open.
+        report = ArchiveReport()
+        names = self.candidates(keep)
+        for i in range(0, len(names), self.batch):
+            if cancel_token is not None and cancel_token.cancelled:
+                return report
+            self._archive_batch(names[i:i + self.batch], report)
+        self._compress_backups(report, cancel_token)
+        return report
+
+    def _archive_batch(self, names, report):
+        cutoff = time.time() - self.after_days * 86400
+        with self._lock:
+            archived = {}
+            original_sizes = {}
+            for name in names:
+                if name in self._pinned:
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Deleted since the scan
+                if stat.st_mtime >= cutoff:
+                    continue  # Written to since the scan
+                archived[name] = _compress(path, self.archive_path(name), stat, self.level)
+                original_sizes[name] = stat.st_size
+            if self.catalog is not None and archived:
+                self.catalog.set_archived(archived)  # Before the originals go, so reconcile keeps them listed
+            for name, size in archived.items():
+                os.remove(os.path.join(self.directory, name))
+                report.add(original_sizes[name], size)
+
+    def _compress_backups(self, report, cancel_token):
+        # The pretty-printed .json originals kept by import_legacy_chats are never read again
+        backup_dir = os.path.join(self.directory, LEGACY_BACKUP_DIR)
+        if not os.path.isdir(backup_dir):
+            return
+        for name in sorted(os.listdir(backup_dir)):
+            if cancel_token is not None and cancel_token.cancelled:
+                return
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(backup_dir, name)
+            stat = os.stat(path)
+            report.add(stat.st_size, _compress(path, path + ARCHIVE_SUFFIX, stat, self.level), backup=True)
+            os.remove(path)
@@ -0,0 +1,156 @@
+import fnmatch
+import json
+import os
+import sqlite3
+import threading
+
+CATALOG_FILE = "catalog.sqlite3"
+TITLE_LENGTH = 60
+
+
+def make_title(content):
+    title = " ".join(content.split())
+    return title[:TITLE_LENGTH - 1] + "…" if len(title) > TITLE_LENGTH else title
+
+
+def scan_chat_file(path):
+    # Returns (title, message_count) without holding the whole file in memory
+    title = ""
+    count = 0
+    with open(path, "rb") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            count += 1
+            if not title:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("role") in ("user", "You"):
+                    title = make_title(entry.get("content", ""))
+    return title, count
+
+
+class ChatCatalog:
+    # Persistent index of the chats in chats_history (title, message count, last update, size)
+    def __init__(self, directory, pattern="chat_history_*.jsonl"):
+        self.directory = directory
+        self.pattern = pattern
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, CATALOG_FILE), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chats ("
+            "name TEXT PRIMARY KEY, title TEXT NOT NULL DEFAULT '', message_count INTEGER NOT NULL DEFAULT 0, "
+            "updated_at REAL NOT NULL DEFAULT 0, size INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(chats)")]
+        if "archived_size" not in columns:
+            # Size of the compressed copy for chats in the archive tier (see ChatArchive); 0 for the others
+            self._db.execute("ALTER TABLE chats ADD COLUMN archived_size INTEGER NOT NULL DEFAULT 0")
+        self._db.commit()
+
+    def _stat(self, name):
+        stat = os.stat(os.path.join(self.directory, name))
+        return stat.st_mtime, stat.st_size
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM chats").fetchone()[0]
+
+    def message_counts(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT name, message_count FROM chats"))
+
+    def get(self, name):
+        with self._lock:
+            return self._db.execute(
+                "SELECT name, title, message_count, updated_at, size, archived_size FROM chats WHERE name = ?",
+                (name,)).fetchone()
+
+    def page(self, before=None, limit=200):
+        # Newest first; keyset pagination so inserts at the top don't shift later pages
+        with self._lock:
+            if before is None:
+                cursor = self._db.execute(
+                    "SELECT name, title, message_count, updated_at, size, archived_size FROM chats "
+                    "ORDER BY name DESC LIMIT ?", (limit,))
+            else:
+                cursor = self._db.execute(
+                    "SELECT name, title, message_count, updated_at, size, archived_size FROM chats WHERE name < ? "
+                    "ORDER BY name DESC LIMIT ?", (before, limit))
+            return cursor.fetchall()
+
+    def index_file(self, name):
+        title, count = scan_chat_file(os.path.join(self.directory, name))
+        updated_at, size = self._stat(name)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO chats (name, title, message_count, updated_at, size) VALUES (?, ?, ?, ?, ?)",
+                (name, title, count, updated_at, size))
+            self._db.commit()
+
+    def record_append(self, name, entries):
+        # Called after entries were appended to the chat file; O(len(entries))
+        updated_at, size = self._stat(name)
+        title = next((make_title(e.get("content", "")) for e in entries if e.get("role") in ("user", "You")), "")
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO chats (name, title, message_count, updated_at, size) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET message_count = message_count + excluded.message_count, "
+                "updated_at = excluded.updated_at, size = excluded.size, "
+                "title = CASE WHEN title = '' THEN excluded.title ELSE title END",
+                (name, title, len(entries), updated_at, size))
+            self._db.commit()
+
+    def set_archived(self, archived_sizes):
+        # {name: compressed size} for chats moved to the archive tier, {name: 0} for chats restored from it
+        with self._lock:
+            self._db.executemany("UPDATE chats SET archived_size = ? WHERE name = ?",
+                                 [(size, name) for name, size in archived_sizes.items()])
+            self._db.commit()
+
+    def archive_totals(self):
+        # (chats, original bytes, compressed bytes) of the archive tier
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(archived_size), 0) FROM chats "
+                "WHERE archived_size > 0").fetchone()
+
+    def remove(self, name):
+        with self._lock:
+            self._db.execute("DELETE FROM chats WHERE name = ?", (name,))
+            self._db.commit()
+
+    def reconcile(self):
+        # Brings the catalog in line with the directory; only new or modified files are re-read
+        on_disk = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and fnmatch.fnmatch(entry.name, self.pattern):
+                    stat = entry.stat()
+                    on_disk[entry.name] = (stat.st_mtime, stat.st_size)
+        with self._lock:
+            known = {}
+            archived = set()
+            for name, updated_at, size, archived_size in self._db.execute(
+                    "SELECT name, updated_at, size, archived_size FROM chats"):
+                known[name] = (updated_at, size)
+                if archived_size:
+                    archived.add(name)
+        added = [name for name in on_disk if name not in known]
+        removed = [name for name in known if name not in on_disk and name not in archived]  # Archived stay listed
+        changed = [name for name in on_disk if name in known and on_disk[name] != known[name]]
+        for name in added + changed:
+            try:
+                self.index_file(name)
+            except OSError:
+                pass  # Deleted while scanning; picked up by the next reconcile
+        for name in removed:
+            self.remove(name)
+        return added, removed, changed
+
+    def close(self):
+        with self._lock:
+            self._db.close()
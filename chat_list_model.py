@@ -0,0 +1,136 @@
+import bisect
+import os
+from datetime import datetime
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, pyqtSignal
+
+CHAT_FILE_ROLE = Qt.ItemDataRole.UserRole
+FETCH_BATCH = 200
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class ChatStoreSignals(QObject):
+    # Bridges ChatStore's writer-thread callback to the GUI thread
+    chat_saved = pyqtSignal(str)
+    indexes_caught_up = pyqtSignal()  # The startup catch-up of the search and vector indexes is done
+    job_failed = pyqtSignal(str, str)  # (what the writer was doing, error)
+
+
+class ChatListModel(QAbstractListModel):
+    # Newest-first list of chats backed by the ChatCatalog, fetched in batches as the view scrolls
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self._names = []  # Loaded chat names, ascending; row 0 is the last (newest) one
+        self._rows = {}
+        self._exhausted = False
+        self._activity = {}  # Chat name -> what its session is doing (shown under the title)
+
+    def reload(self):
+        self.beginResetModel()
+        self._names = []
+        self._rows = {}
+        self._exhausted = False
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._names)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        oldest = self._names[0] if self._names else None
+        rows = self.catalog.page(before=oldest, limit=FETCH_BATCH)
+        if len(rows) < FETCH_BATCH:
+            self._exhausted = True
+        if not rows:
+            return
+        count = len(self._names)
+        self.beginInsertRows(QModelIndex(), count, count + len(rows) - 1)
+        self._names[:0] = [row[0] for row in reversed(rows)]
+        for row in rows:
+            self._rows[row[0]] = row
+        self.endInsertRows()
+
+    def _row_of(self, name):
+        i = bisect.bisect_left(self._names, name)
+        if i < len(self._names) and self._names[i] == name:
+            return len(self._names) - 1 - i
+        return -1
+
+    def name_at(self, row):
+        return self._names[len(self._names) - 1 - row]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self.name_at(index.row())
+        _, title, count, updated_at, size, archived_size = self._rows[name]
+        if role == Qt.ItemDataRole.DisplayRole:
+            updated = datetime.fromtimestamp(updated_at).strftime("%Y-%m-%d %H:%M")
+            text = f"{title or 'New chat'}\n{count} messages · {updated}"
+            activity = self._activity.get(name)
+            return f"{text}\n● {activity}" if activity else text
+        if role == Qt.ItemDataRole.ToolTipRole:
+            tooltip = f"{name}\n{count} messages, {format_size(size)}"
+            return f"{tooltip} (archived: {format_size(archived_size)})" if archived_size else tooltip
+        if role == CHAT_FILE_ROLE:
+            return name
+        return None
+
+    def index_of(self, name):
+        row = self._row_of(name)
+        return self.index(row) if row >= 0 else QModelIndex()
+
+    def chat_added(self, name):
+        row = self.catalog.get(name)
+        if row is None or self._row_of(name) >= 0:
+            return
+        i = bisect.bisect_left(self._names, name)
+        if i == 0 and self._names and not self._exhausted:
+            return  # Older than everything loaded so far: it arrives with a later fetchMore
+        view_row = len(self._names) - i
+        self.beginInsertRows(QModelIndex(), view_row, view_row)
+        self._names.insert(i, name)
+        self._rows[name] = row
+        self.endInsertRows()
+
+    def chat_removed(self, name):
+        row = self._row_of(name)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._names[len(self._names) - 1 - row]
+        del self._rows[name]
+        self.endRemoveRows()
+
+    def chat_changed(self, name):
+        row = self._row_of(name)
+        if row < 0:
+            self.chat_added(name)
+            return
+        self._rows[name] = self.catalog.get(name) or self._rows[name]
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def set_activity(self, name, activity):
+        if activity:
+            self._activity[name] = activity
+        else:
+            self._activity.pop(name, None)
+        row = self._row_of(name)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    def chat_saved(self, path):
+        self.chat_changed(os.path.basename(path))
@@ -0,0 +1,78 @@
+import time
+from client_pool import bind_cancel_token
+from mistral_backend import get_backend
+from response_cache import make_key
+
+MODELS = ["mistral-large", "mistral-small", "mistral-next", "codestral-latest"]
+DEFAULT_MODEL = "codestral-latest"
+DEFAULT_SYSTEM_PROMPT = (
+    "Imagine that you are an expert software developer who is able to create innovative, user-friendly and "
+    "advanced software solutions for users. Make your answer technical, but in a language that most non-technical "
+    "people can understand. Also, format your reply using Whatsapp style text formatting. Carefully review and "
+    "evaluate each reported problem/bug or message and then think deeply and carefully about a solution before "
+    "recommending it. Try to simulate and test any generated code or script before replying."
+)
+
+
+def create_client(api_key, base_url, http_client):
+    # ClientPool factory for whichever SDK is installed (mistralai >= 1.0 or <= 0.4.2)
+    return get_backend().create_client(api_key, base_url, http_client)
+
+
+def _record_usage(report, usage):
+    if report is not None and usage is not None:
+        report["prompt_tokens"] = usage.prompt_tokens
+        report["completion_tokens"] = usage.completion_tokens
+
+
+def complete(client, model, messages, report=None):
+    # `report`, if given, receives the token usage
+    response = get_backend().complete(client, model, messages)
+    _record_usage(report, getattr(response, "usage", None))
+    return response.choices[0].message.content
+
+
+def stream(client, model, messages, report=None):
+    # Yields the text of each streamed token; `report` receives the usage and when the first token arrived
+    for chunk in get_backend().stream(client, model, messages):
+        _record_usage(report, getattr(chunk, "usage", None))  # Sent with the last chunk
+        text = chunk.choices[0].delta.content if chunk.choices else None
+        if isinstance(text, str) and text:
+            if report is not None:
+                report.setdefault("first_token", time.perf_counter())
+            yield text
+
+
+def get_response(client_pool, messages, api_key, model, cancel_token=None, scheduler=None, report=None):
+    # Blocking request through the pooled client for api_key; raises on API or network errors.
+    # With a scheduler it is rate limited, retried, and shared with identical requests in flight.
+    if scheduler is not None:
+        return scheduler.run(
+            api_key, lambda: get_response(client_pool, messages, api_key, model, cancel_token, report=report),
+            key=make_key(model, messages), cancel_token=cancel_token)
+    client = client_pool.get(api_key)
+    if cancel_token is None:
+        return complete(client, model, messages, report)
+    with bind_cancel_token(cancel_token):  # Cancelling closes this request's connection
+        return complete(client, model, messages, report)
+
+
+def get_stream_response(client_pool, messages, api_key, model, cancel_token, parts=None, scheduler=None,
+                        report=None):
+    # Streams through the pooled client, passing each token to cancel_token.publish; returns the full text.
+    # Tokens are collected in `parts`, so a caller passing its own list keeps them if the stream fails.
+    parts = [] if parts is None else parts
+    if scheduler is not None:
+        # Retried only until the first token has been shown
+        return scheduler.run(
+            api_key, lambda: get_stream_response(
+                client_pool, messages, api_key, model, cancel_token, parts, report=report),
+            cancel_token=cancel_token, can_retry=lambda: not parts)
+    client = client_pool.get(api_key)
+    with bind_cancel_token(cancel_token):
+        for text in stream(client, model, messages, report):
+            if cancel_token.cancelled:
+                break
+            parts.append(text)
+            cancel_token.publish(text)
+    return "".join(parts)
@@ -0,0 +1,27 @@
+from collections import deque
+
+
+class ChatSession:
+    # One open chat: its loaded messages, the request in flight and the messages queued behind it.
+    # Replies are routed to the session that sent them, whichever chat is on screen when they arrive.
+    def __init__(self, chat_file=None):
+        self.chat_file = chat_file
+        self.chat_history = []
+        self.saved_count = 0  # Number of chat_history entries already on disk
+        self.history_offset = 0  # Byte offset in the chat file of the first loaded message
+        self.history_start = 0  # Position in the chat of the first loaded message
+        self.pending_request = None
+        self.queue = deque()  # Messages (with the settings they were sent with) waiting for the request in flight
+        self.stream_timestamp = None
+        self.stream_parts = []  # Tokens streamed so far, to redraw the reply when the chat is shown again
+
+    @property
+    def busy(self):
+        return self.pending_request is not None or bool(self.queue)
+
+    def activity(self):
+        # Short status for the sidebar; empty when idle
+        if not self.busy:
+            return ""
+        status = "generating" if self.pending_request is not None else "waiting"
+        return f"{status}, {len(self.queue)} queued" if self.queue else status
@@ -0,0 +1,317 @@
+import glob
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+CHAT_DIR = "chats_history"
+CHAT_PATTERN = "chat_history_*.jsonl"
+LEGACY_PATTERN = "chat_history_*.json"
+LEGACY_BACKUP_DIR = "legacy_json"
+READ_BLOCK = 64 * 1024
+RECORD_END = b"}\n"  # Every record is a JSON object on one line; a line torn mid-write almost never ends so
+
+
+class ChatStore:
+    # Chats are JSON Lines logs: saving a turn appends its lines instead of rewriting the file.
+    # All writes go through one background thread, so they stay ordered and off the GUI thread.
+    def __init__(self, directory=CHAT_DIR, fsync=True, catalog=None, on_saved=None):
+        self.directory = directory
+        self.fsync = fsync
+        self.catalog = catalog  # Optional ChatCatalog kept in step with every write
+        self.search_index = None  # Optional SearchIndex, updated with every appended turn
+        self.vector_index = None  # Optional VectorIndex (embeddings for chat memory), updated the same way
+        self.on_saved = on_saved  # Called on the writer thread with the path after each write
+        self.on_failed = None  # Called on the writer thread with (description of the job, error) when one fails
+        self.metrics = None  # Optional Metrics receiving the duration of every write
+        self.archive = None  # Optional ChatArchive holding the compressed copies of inactive chats
+        self.last_write_seconds = 0.0
+        self.closing = False  # Set by close(); background jobs that reschedule themselves stop then
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue()
+        self._pending = {}  # path -> writes queued for it, so reads wait only for their own file
+        self._pending_changed = threading.Condition()
+        self._unsaved = {}  # path -> entries whose append failed; written ahead of the next append to the file
+        self._thread = threading.Thread(target=self._run, name="chat-store-writer", daemon=True)
+        self._thread.start()
+
+    def path_for(self, name):
+        return os.path.join(self.directory, name)
+
+    def create(self, path):
+        # Synchronous so the new chat is on disk before the sidebar is refreshed
+        open(path, "a", encoding="utf-8").close()
+        if self.catalog is not None:
+            self.catalog.index_file(os.path.basename(path))
+
+    def append(self, path, entries):
+        if entries:
+            self._put(self._append, path, [dict(entry) for entry in entries])
+
+    def load_window(self, path, limit=100, end=None):
+        # Reads the last `limit` messages before byte offset `end` (default: end of file) by scanning
+        # backwards, so opening a long chat doesn't parse it all. Returns (entries, start offset).
+        self.flush(path)
+        with open(path, "rb") as file:
+            if end is None:
+                end = file.seek(0, os.SEEK_END)
+            start = end
+            chunks = []
+            newlines = 0
+            while start > 0 and newlines <= limit:
+                size = min(READ_BLOCK, start)
+                start -= size
+                file.seek(start)
+                chunk = file.read(size)
+                chunks.append(chunk)
+                newlines += chunk.count(b"\n")
+        data = b"".join(reversed(chunks))
+        lines = data.split(b"\n")
+        if start > 0:
+            start += len(lines[0]) + 1  # The first piece may be the tail of an earlier line
+            lines = lines[1:]
+        offsets = []
+        offset = start
+        for line in lines:
+            offsets.append(offset)
+            offset += len(line) + 1
+        kept = [(o, line) for o, line in zip(offsets, lines) if line.strip()][-limit:]
+        if not kept:
+            return [], end
+        entries, damaged = _parse_lines(line for _, line in kept)
+        if damaged:
+            # Positions must match the ones the search index stores: drop the bad lines, then read again
+            moved = self.repair(path, end or 0)
+            if moved is not None:
+                return self.load_window(path, limit, None if end is None else moved)
+        return entries, kept[0][0]
+
+    def load_from(self, path, position):
+        # Reads every message from the given position to the end; returns (entries, start offset)
+        self.flush(path)
+        with open(path, "rb") as file:
+            offset = 0
+            skipped = 0
+            while skipped < position:
+                line = file.readline()
+                if not line:
+                    break
+                offset += len(line)
+                skipped += line.endswith(RECORD_END)
+            entries, damaged = _parse_lines(file)
+        if damaged and self.repair(path) is not None:
+            return self.load_from(path, position)
+        return entries, offset
+
+    def count_before(self, path, offset):
+        # Position of the message starting at `offset`. Counts the lines ending like a record without parsing
+        # JSON, so a torn or blank line doesn't shift the positions away from the search index's.
+        count = 0
+        last = b""
+        with open(path, "rb") as file:
+            while offset > 0:
+                chunk = file.read(min(READ_BLOCK, offset))
+                if not chunk:
+                    break
+                count += (last + chunk).count(RECORD_END)  # `last` catches a record end split between chunks
+                last = chunk[-1:]
+                offset -= len(chunk)
+        return count
+
+    def compact(self, path, entries):
+        self._put(self._rewrite, path, [dict(entry) for entry in entries])
+
+    def repair(self, path, offset=0):
+        # Rewrites the chat without its unreadable lines (e.g. one torn by a crash mid-write) and waits for it.
+        # Returns where the line that started at byte `offset` starts in the rewritten file, or None if the
+        # rewrite failed.
+        entries = []
+        old_offset, new_offset, moved = 0, 0, None
+        with open(path, "rb") as file:
+            for line in file:
+                if moved is None and old_offset >= offset:
+                    moved = new_offset
+                old_offset += len(line)
+                for entry in _parse_lines([line])[0]:
+                    entries.append(entry)
+                    new_offset += len(json.dumps(entry, ensure_ascii=False).encode("utf-8")) + 1
+        self.compact(path, entries)
+        self.flush(path)
+        if os.path.getsize(path) != new_offset:
+            return None  # Reported by the writer thread; the chat is read around the bad lines meanwhile
+        return new_offset if moved is None else moved
+
+    def delete(self, path):
+        self.flush(path)
+        if self.archive is not None:
+            self.archive.discard(os.path.basename(path))  # An archived chat only has its compressed copy
+        if os.path.exists(path):
+            os.remove(path)
+        if self.catalog is not None:
+            self.catalog.remove(os.path.basename(path))
+        # The indexes are updated on the writer thread, after any catch-up batch already reading the chat
+        name = os.path.basename(path)
+        if self.search_index is not None:
+            self.schedule(lambda: self.search_index.remove_chat(name), f"remove {name} from the search index")
+        if self.vector_index is not None:
+            self.schedule(lambda: self.vector_index.remove_chat(name), f"remove {name} from the vector index")
+        self.schedule(lambda: self._unsaved.pop(path, None), f"forget the unsaved turns of {name}")
+
+    def schedule(self, func, description=None):
+        # Runs func() on the writer thread, ordered with the pending writes. `description` names the job
+        # if it fails ("catch up vector index" for catch_up_vector_index by default).
+        self._queue.put((lambda path, entries: func(), None, None, description or func.__name__.replace("_", " ")))
+
+    def has_unsaved(self):
+        return bool(self._unsaved)
+
+    def retry_unsaved(self):
+        # Appends the turns of every chat whose last append failed (e.g. once the disk has room again)
+        self.schedule(self._retry_unsaved, "save the turns that failed to save")
+
+    def _retry_unsaved(self):
+        for path in list(self._unsaved):
+            self._append(path, [])
+
+    def flush(self, path=None):
+        # Waits for the writes queued for `path`, or for every queued job (catch-ups included) if None
+        if path is None:
+            self._queue.join()
+            return
+        with self._pending_changed:
+            self._pending_changed.wait_for(lambda: path not in self._pending)
+
+    def _put(self, func, path, entries):
+        with self._pending_changed:
+            self._pending[path] = self._pending.get(path, 0) + 1
+        self._queue.put((func, path, entries, f"{func.__name__.strip('_')} {path}"))
+
+    def _done(self, path):
+        with self._pending_changed:
+            self._pending[path] -= 1
+            if not self._pending[path]:
+                del self._pending[path]
+                self._pending_changed.notify_all()
+
+    def close(self):
+        self.closing = True
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                func, path, entries, description = job
+                start = time.perf_counter()
+                func(path, entries)
+                self.last_write_seconds = time.perf_counter() - start
+                if self.metrics is not None and path is not None:
+                    self.metrics.observe("chat_store_write_seconds", self.last_write_seconds,
+                                         operation=func.__name__.strip("_"))
+                if self.on_saved is not None and path is not None:
+                    self.on_saved(path)
+            except Exception as e:  # Keep the writer alive; a failed append is retried with the next one
+                if self.on_failed is not None:
+                    self.on_failed(description, str(e))
+            finally:
+                if job is not None and job[1] is not None:
+                    self._done(job[1])
+                self._queue.task_done()
+
+    def _append(self, path, entries):
+        entries = self._unsaved.pop(path, []) + entries
+        if not entries:
+            return
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        try:
+            with open(path, "a+b", buffering=0) as file:  # Unbuffered: nothing is left to flush after a failure
+                size = file.tell()
+                # If a crash left a torn last line, terminate it so the new records stay readable
+                if size > 0:
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) != b"\n":
+                        data = "\n" + data
+                try:
+                    data = memoryview(data.encode("utf-8"))
+                    while data:
+                        data = data[file.write(data):]
+                    if self.fsync:
+                        os.fsync(file.fileno())
+                except OSError:
+                    file.truncate(size)  # Drop the part that got written, so the retry doesn't duplicate it
+                    raise
+        except OSError:
+            # e.g. disk full or no permission: the turns are kept and written ahead of the next append
+            self._unsaved[path] = entries
+            raise
+        if self.catalog is not None:
+            self.catalog.record_append(os.path.basename(path), entries)
+        if self.search_index is not None:
+            self.search_index.add_messages(os.path.basename(path), entries)
+        if self.vector_index is not None:
+            self.vector_index.add_messages(os.path.basename(path), entries)
+
+    def _rewrite(self, path, entries):
+        write_atomic(path, entries, self.fsync)
+        if self.catalog is not None:
+            self.catalog.index_file(os.path.basename(path))
+        if self.search_index is not None:
+            self.search_index.reindex_chat(os.path.basename(path), entries)
+        if self.vector_index is not None:
+            self.vector_index.reindex_chat(os.path.basename(path), entries)
+
+
+def _parse_lines(lines):
+    # Returns (entries, whether a line couldn't be read); blank lines are skipped
+    entries = []
+    damaged = False
+    for line in lines:
+        if line.strip():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                damaged = True  # e.g. torn by a crash mid-write; ChatStore.repair() removes it
+    return entries, damaged
+
+
+def write_atomic(path, entries, fsync=True):
+    # Write to a temporary file and rename it over the original, so readers never see a partial file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        for entry in entries:
+            file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        file.flush()
+        if fsync:
+            os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def import_legacy_chats(directory=CHAT_DIR):
+    # One-time conversion of chat_history_*.json files; originals are kept in legacy_json/.
+    # Returns (chats imported, [(file name, error)] for the files that couldn't be read).
+    imported = 0
+    skipped = []
+    backup_dir = os.path.join(directory, LEGACY_BACKUP_DIR)
+    for json_path in glob.glob(os.path.join(directory, LEGACY_PATTERN)):
+        jsonl_path = json_path + "l"
+        try:
+            with open(json_path, "r", encoding="utf-8") as file:
+                entries = json.load(file)
+        except (OSError, ValueError) as e:
+            skipped.append((os.path.basename(json_path), str(e)))
+            continue
+        if not os.path.exists(jsonl_path):
+            write_atomic(jsonl_path, entries)
+            # Keeps the chat's last activity, which the sidebar shows and archiving goes by
+            stat = os.stat(json_path)
+            os.utime(jsonl_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.makedirs(backup_dir, exist_ok=True)
+        shutil.move(json_path, os.path.join(backup_dir, os.path.basename(json_path)))
+        imported += 1
+    return imported, skipped
@@ -0,0 +1,268 @@
+import os
+import socket
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import httpcore
+import httpx
+
+# MISTRAL_BASE_URL points the apps at another server, e.g. mock_mistral_server.py for benchmarks
+DEFAULT_BASE_URL = os.environ.get("MISTRAL_BASE_URL", "https://api.mistral.ai")
+
+_bound = threading.local()
+
+
+@contextmanager
+def bind_cancel_token(token):
+    # Lets the transport find the cancel token of the request running on this thread
+    _bound.token = token
+    try:
+        yield
+    finally:
+        _bound.token = None
+
+
+class ConnectionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    def count_connection(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def count_request(self):
+        with self._lock:
+            self.requests_sent += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"connections_opened": self.connections_opened, "requests_sent": self.requests_sent}
+
+
+class _TrackedStream(httpcore.NetworkStream):
+    # Reports to the backend which thread is sending a request over the connection
+    def __init__(self, backend, stream):
+        self._backend = backend
+        self._stream = stream
+
+    def read(self, max_bytes, timeout=None):
+        return self._stream.read(max_bytes, timeout)
+
+    def write(self, buffer, timeout=None):
+        self._backend.in_use(self)
+        self._stream.write(buffer, timeout)
+
+    def close(self):
+        self._stream.close()
+
+    def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        return _TrackedStream(self._backend, self._stream.start_tls(ssl_context, server_hostname, timeout))
+
+    def get_extra_info(self, info):
+        return self._stream.get_extra_info(info)
+
+
+class _TrackingBackend(httpcore.NetworkBackend):
+    # Lets a cancel abort the one connection a request thread is waiting on, leaving the pool alone
+    def __init__(self, backend):
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._streams = {}  # Thread id -> connection its current request was sent over
+        self._aborted = set()  # Threads cancelled before their request was sent
+
+    def connect_tcp(self, *args, **kwargs):
+        return _TrackedStream(self, self._backend.connect_tcp(*args, **kwargs))
+
+    def connect_unix_socket(self, *args, **kwargs):
+        return _TrackedStream(self, self._backend.connect_unix_socket(*args, **kwargs))
+
+    def sleep(self, seconds):
+        self._backend.sleep(seconds)
+
+    def in_use(self, stream):
+        thread = threading.get_ident()
+        with self._lock:
+            aborted = thread in self._aborted
+            self._streams[thread] = stream
+        if aborted:
+            _shutdown(stream)  # The request fails as soon as it waits for the response
+
+    def release(self, thread):
+        with self._lock:
+            self._streams.pop(thread, None)
+            self._aborted.discard(thread)
+
+    def abort(self, thread):
+        # shutdown() (unlike close()) wakes a recv() blocked on another thread; httpcore then drops the connection
+        with self._lock:
+            stream = self._streams.pop(thread, None)
+            if stream is None:
+                self._aborted.add(thread)
+        if stream is not None:
+            _shutdown(stream)
+
+
+def _shutdown(stream):
+    sock = stream.get_extra_info("socket")
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        on_close, self._on_close = self._on_close, None
+        try:
+            self._stream.close()
+        finally:
+            if on_close is not None:
+                on_close()
+
+
+class CountingTransport(httpx.HTTPTransport):
+    def __init__(self, stats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+        self._backend = _TrackingBackend(self._pool._network_backend)
+        self._pool._network_backend = self._backend
+        self._lock = threading.Lock()
+        self._active = 0  # Requests whose response hasn't been closed yet
+        self._on_idle = None  # Set by retire(): closes the client once the last of them is done
+
+    def retire(self, close):
+        # Calls close() now, or when the requests still in flight are done, so evicting a client from the
+        # pool doesn't cut off a reply that is streaming through it
+        with self._lock:
+            if self._active:
+                self._on_idle = close
+                return
+        close()
+
+    def _finished(self):
+        with self._lock:
+            self._active -= 1
+            on_idle = self._on_idle if not self._active else None
+            if on_idle is not None:
+                self._on_idle = None
+        if on_idle is not None:
+            on_idle()
+
+    def handle_request(self, request):
+        with self._lock:
+            self._active += 1
+        try:
+            response = self._handle_request(request)
+        except BaseException:
+            self._finished()
+            raise
+        if response.is_closed:
+            self._finished()  # Cancelled as it arrived
+        else:
+            response.stream = _ReleasingStream(response.stream, self._finished)
+        return response
+
+    def _handle_request(self, request):
+        self.stats.count_request()
+        parent_trace = request.extensions.get("trace")
+
+        # httpcore reports every new TCP connection through the trace extension
+        def trace(event_name, info):
+            if event_name == "connection.connect_tcp.complete":
+                self.stats.count_connection()
+            if parent_trace is not None:
+                parent_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        token = getattr(_bound, "token", None)
+        thread = threading.get_ident()
+        if token is None:
+            try:
+                return super().handle_request(request)
+            finally:
+                self._backend.release(thread)
+
+        received = []
+
+        def abort():
+            if received:
+                received[0].close()  # Drops just this connection and unblocks the reading thread
+            else:
+                self._backend.abort(thread)  # Still waiting for headers: cut this request's connection
+
+        unregister = token.on_cancel(abort)
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            unregister()
+            raise
+        finally:
+            self._backend.release(thread)
+        received.append(response)
+        # The abort (and through it the response) is dropped from the token once the response is closed,
+        # so a long-lived token such as an attachment's doesn't collect one per request
+        response.stream = _ReleasingStream(response.stream, unregister)
+        if token.cancelled:
+            response.close()
+        return response
+
+
+class ClientPool:
+    # One SDK client (and one keep-alive HTTP connection pool) per (API key, base URL)
+    def __init__(self, factory, max_clients=4, timeout=120, max_keepalive=8):
+        self.factory = factory  # factory(api_key, base_url, http_client) -> SDK client
+        self.max_clients = max_clients
+        self.timeout = timeout
+        self.max_keepalive = max_keepalive  # Idle connections kept per client; raise it for concurrent batches
+        self.stats = ConnectionStats()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, api_key, base_url=None):
+        return self._entry(api_key, base_url)[0]
+
+    def _entry(self, api_key, base_url):
+        key = (api_key, base_url or DEFAULT_BASE_URL)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            transport = CountingTransport(
+                self.stats, limits=httpx.Limits(max_keepalive_connections=self.max_keepalive, keepalive_expiry=120))
+            http_client = httpx.Client(transport=transport, timeout=self.timeout, follow_redirects=True)
+            entry = (self.factory(api_key, key[1], http_client), http_client, transport)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_clients:
+                _, (_, old_http_client, old_transport) = self._entries.popitem(last=False)
+                old_transport.retire(old_http_client.close)  # Closed once its replies are done
+            return entry
+
+    def discard(self, api_key, base_url=None):
+        with self._lock:
+            entry = self._entries.pop((api_key, base_url or DEFAULT_BASE_URL), None)
+        if entry is not None:
+            entry[2].retire(entry[1].close)
+
+    def warm(self, api_key, base_url=None):
+        # Opens the TCP+TLS connection ahead of the first message (also validates the key)
+        base_url = base_url or DEFAULT_BASE_URL
+        http_client = self._entry(api_key, base_url)[1]
+        response = http_client.get(f"{base_url}/v1/models", headers={"Authorization": f"Bearer {api_key}"})
+        return response.status_code == 200
+
+    def close_all(self):
+        with self._lock:
+            entries, self._entries = list(self._entries.values()), OrderedDict()
+        for _, http_client, _ in entries:
+            http_client.close()
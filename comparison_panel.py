@@ -0,0 +1,106 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QHBoxLayout, QLabel, QPushButton, QTextBrowser, QVBoxLayout, QWidget
+
+from message_format import StreamingFormatter, render_message
+
+REFRESH_MS = 100
+
+
+class FanOutSignals(QObject):
+    # Bridges the fan-out request threads to the GUI thread; `run` identifies the send
+    chunk = pyqtSignal(object, str, str)
+    answered = pyqtSignal(object, object)
+
+
+class ComparisonPanel(QWidget):
+    # The answers of a multi-model send side by side, with each model's latency
+    preferred = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.run = None
+        self.models = []
+        self._columns = {}
+        self._dirty = set()
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        header_layout = QHBoxLayout()
+        self.title_label = QLabel("")
+        header_layout.addWidget(self.title_label, 1)
+        close_button = QPushButton("Close Comparison")
+        close_button.clicked.connect(self.hide)
+        header_layout.addWidget(close_button)
+        layout.addLayout(header_layout)
+
+        self.columns_layout = QHBoxLayout()
+        layout.addLayout(self.columns_layout)
+
+        # Streamed tokens are drawn in batches, like the main transcript
+        self._timer = QTimer(self)
+        self._timer.setInterval(REFRESH_MS)
+        self._timer.timeout.connect(self._refresh)
+        self.hide()
+
+    def start(self, run, models, hedge):
+        # Chunks and answers of any earlier run are ignored from now on
+        for column in self._columns.values():
+            column["widget"].deleteLater()
+        self.run = run
+        self.models = list(models)
+        self._columns = {}
+        self._dirty = set()
+        for model in models:
+            widget = QWidget()
+            column_layout = QVBoxLayout(widget)
+            label = QLabel(f"{model}: waiting…")
+            label.setWordWrap(True)
+            browser = QTextBrowser()
+            prefer_button = QPushButton("Prefer")
+            prefer_button.setEnabled(False)
+            prefer_button.clicked.connect(lambda checked, model=model: self.preferred.emit(model))
+            column_layout.addWidget(label)
+            column_layout.addWidget(browser, 1)
+            column_layout.addWidget(prefer_button)
+            self.columns_layout.addWidget(widget)
+            self._columns[model] = {"widget": widget, "label": label, "browser": browser,
+                                    "button": prefer_button, "parts": [], "formatter": StreamingFormatter()}
+        self.title_label.setText("Fastest wins: the slower requests are cancelled" if hedge
+                                 else f"Comparing {len(models)} models")
+        self.show()
+
+    def add_chunk(self, run, model, text):
+        if run is not self.run or model not in self._columns:
+            return
+        self._columns[model]["parts"].append(text)
+        self._dirty.add(model)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _refresh(self):
+        if not self._dirty:
+            self._timer.stop()
+            return
+        for model in self._dirty:
+            column = self._columns[model]
+            column["browser"].setHtml(column["formatter"].render("".join(column["parts"])))
+        self._dirty = set()
+
+    def set_answer(self, run, answer):
+        column = self._columns.get(answer.model) if run is self.run else None
+        if column is None:
+            return
+        self._dirty.discard(answer.model)
+        if answer.text:
+            column["browser"].setHtml(render_message(answer.text))
+        if answer.status == "ok":
+            first_token = f", first token {answer.first_token:.2f} s" if answer.first_token is not None else ""
+            text = f"{answer.model}: {answer.latency:.2f} s{first_token}{' (fastest)' if answer.won else ''}"
+        elif answer.status == "lost":
+            text = f"{answer.model}: cancelled after {answer.latency:.2f} s (slower)"
+        elif answer.status == "error":
+            text = f"{answer.model}: failed: {answer.error}"
+        else:
+            text = f"{answer.model}: cancelled"
+        column["label"].setText(text)
+        column["button"].setEnabled(answer.status == "ok")
@@ -0,0 +1,99 @@
+DEFAULT_BUDGET = 8000
+
+# Tokens of earlier turns (plus system prompt and new message) sent with each request
+MODEL_BUDGETS = {
+    "mistral-large": 24000,
+    "mistral-small": 16000,
+    "mistral-next": 16000,
+    "codestral-latest": 24000,
+}
+
+MESSAGE_OVERHEAD = 4  # Role and separator tokens added per message
+
+API_ROLES = {"user": "user", "You": "user", "bot": "assistant", "AI": "assistant", "assistant": "assistant"}
+
+
+def length_tokens(chars):
+    # Roughly 4 characters per token for Mistral's tokenizer on English text and code
+    return (chars + 3) // 4 + MESSAGE_OVERHEAD
+
+
+def estimate_tokens(text):
+    return length_tokens(len(text))
+
+
+def entry_tokens(content, attachments=(), chars=None):
+    # Attachments are counted from the size in their reference, without reading the blob.
+    # `chars` stands in for the content's length when the text itself isn't at hand.
+    tokens = length_tokens(len(content) if chars is None else chars)
+    return tokens + sum((ref["chars"] + 3) // 4 for ref in attachments)
+
+
+class ContextBuilder:
+    def __init__(self, budgets=None, default_budget=DEFAULT_BUDGET):
+        self.budgets = dict(MODEL_BUDGETS if budgets is None else budgets)
+        self.default_budget = default_budget
+        self._history = None
+        self._counts = []
+        self._system_prompt = None
+        self._system_tokens = 0
+        self.blobs = None  # Optional BlobStore holding the attachments referenced by messages
+
+    def budget_for(self, model):
+        return self.budgets.get(model, self.default_budget)
+
+    def set_budget(self, model, tokens):
+        self.budgets[model] = tokens
+
+    def _sync(self, history):
+        # Token counts are cached per message; only turns added since the last call are counted
+        if history is not self._history or len(history) < len(self._counts):
+            self._history = history
+            self._counts = []
+        for entry in history[len(self._counts):]:
+            self._counts.append(entry_tokens(entry.get("content", ""), entry.get("attachments", ())))
+
+    def _system_prompt_tokens(self, system_prompt):
+        if system_prompt != self._system_prompt:
+            self._system_prompt = system_prompt
+            self._system_tokens = estimate_tokens(system_prompt) if system_prompt else 0
+        return self._system_tokens
+
+    def _content(self, entry):
+        refs = entry.get("attachments")
+        if refs and self.blobs is not None:
+            return self.blobs.expand(entry.get("content", ""), refs)  # Only turns that are sent are read
+        return entry.get("content", "")
+
+    def select(self, history, system_prompt, message, model, attachments=(), message_chars=None):
+        # Returns (index of the oldest turn to include, estimated prompt tokens)
+        self._sync(history)
+        total = self._system_prompt_tokens(system_prompt) + entry_tokens(message, attachments, message_chars)
+        budget = self.budget_for(model)
+        start = len(history)
+        while start > 0 and total + self._counts[start - 1] <= budget:
+            start -= 1
+            total += self._counts[start]
+        return start, total
+
+    def estimate(self, history, system_prompt, message_chars, model, attachments=()):
+        # Takes the length of the message being typed, so the composer never has to copy its text out
+        start, total = self.select(history, system_prompt, "", model, attachments, message_chars)
+        return total, len(history) - start
+
+    def build(self, history, system_prompt, message, model, attachments=()):
+        start, _ = self.select(history, system_prompt, message, model, attachments)
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        turns = []
+        for entry in history[start:] + [{"role": "user", "content": message, "attachments": attachments}]:
+            role = API_ROLES.get(entry.get("role"))
+            if role is None or (role == "assistant" and not turns):
+                continue  # The conversation sent to the API must open with a user turn
+            if turns and turns[-1]["role"] == role:
+                # e.g. a cancelled request left two user turns in a row
+                turns[-1]["content"] += "\n\n" + self._content(entry)
+            else:
+                turns.append({"role": role, "content": self._content(entry)})
+        return messages + turns
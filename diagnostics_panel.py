@@ -0,0 +1,93 @@
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import (QCheckBox, QDialog, QHBoxLayout, QHeaderView, QLabel, QPushButton, QTableWidget,
+                             QTableWidgetItem, QVBoxLayout)
+
+COLUMNS = ["Metric", "Labels", "Count", "Mean", "p50", "p95", "Max"]
+REFRESH_MS = 1000
+
+
+def format_value(name, value):
+    # Durations are stored in seconds and shown in milliseconds
+    return f"{value * 1000:.1f} ms" if name.endswith("_seconds") else f"{value:.1f}"
+
+
+class DiagnosticsDialog(QDialog):
+    # Live view of the app's Metrics: latency histograms, token throughput and usage counters
+    def __init__(self, metrics, export, parent=None):
+        super().__init__(parent)
+        self.metrics = metrics
+        self.export = export  # Writes the metrics files; returns the directory they are in
+        self.setWindowTitle("Diagnostics")
+        self.resize(820, 480)
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        self.counters_label = QLabel("")
+        self.counters_label.setWordWrap(True)
+        layout.addWidget(self.counters_label)
+
+        button_layout = QHBoxLayout()
+        self.profile_checkbox = QCheckBox("Profile the next request (cProfile)")
+        self.profile_checkbox.setChecked(metrics.profile_next)
+        self.profile_checkbox.toggled.connect(self.set_profile_next)
+        button_layout.addWidget(self.profile_checkbox)
+        export_button = QPushButton("Export")
+        export_button.clicked.connect(self.export_now)
+        button_layout.addWidget(export_button)
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+        button_layout.addWidget(reset_button)
+        layout.addLayout(button_layout)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # Refreshes only while the dialog is open
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh()
+
+    def showEvent(self, event):
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def set_profile_next(self, enabled):
+        self.metrics.profile_next = enabled
+
+    def refresh(self):
+        snapshot = self.metrics.snapshot()
+        histograms = snapshot["histograms"]
+        self.table.setRowCount(len(histograms))
+        for row, histogram in enumerate(histograms):
+            name = histogram["name"]
+            labels = ", ".join(f"{k}={v}" for k, v in histogram["labels"].items())
+            values = [name, labels, str(histogram["count"])] + [
+                format_value(name, histogram[field]) for field in ("mean", "p50", "p95", "max")]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        self.counters_label.setText("   ".join(
+            f"{c['name']}{'[' + ','.join(map(str, c['labels'].values())) + ']' if c['labels'] else ''}: {c['value']}"
+            for c in snapshot["counters"]))
+        # The checkbox clears itself once the profiled request has run
+        if self.profile_checkbox.isChecked() != self.metrics.profile_next:
+            self.profile_checkbox.blockSignals(True)
+            self.profile_checkbox.setChecked(self.metrics.profile_next)
+            self.profile_checkbox.blockSignals(False)
+
+    def export_now(self):
+        directory = self.export()
+        self.status_label.setText(f"Exported to {directory}")
+
+    def reset(self):
+        self.metrics.reset()
+        self.refresh()
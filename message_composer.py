@@ -0,0 +1,38 @@
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QPlainTextEdit
+
+COUNT_DEBOUNCE_MS = 300
+VISIBLE_LINES = (3, 10)  # The composer's height range, in lines
+
+
+class MessageComposer(QPlainTextEdit):
+    # Multi-line message field: Enter sends, Shift+Enter starts a new line. QPlainTextEdit lays out
+    # only the visible blocks, so multi-MB pastes don't stall the GUI, and nothing caps the length.
+    submitted = pyqtSignal()
+    counted = pyqtSignal(int)  # Characters in the message, emitted once typing or pasting pauses
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setTabChangesFocus(True)
+        line = self.fontMetrics().lineSpacing()
+        margins = 2 * (self.frameWidth() + int(self.document().documentMargin()))
+        self.setMinimumHeight(VISIBLE_LINES[0] * line + margins)
+        self.setMaximumHeight(VISIBLE_LINES[1] * line + margins)
+        self._count_timer = QTimer(self)
+        self._count_timer.setSingleShot(True)
+        self._count_timer.setInterval(COUNT_DEBOUNCE_MS)
+        self._count_timer.timeout.connect(lambda: self.counted.emit(self.character_count()))
+        self.textChanged.connect(self._count_timer.start)
+
+    def character_count(self):
+        # From the document itself, without copying the text out
+        return max(0, self.document().characterCount() - 1)
+
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+            if event.modifiers() & Qt.KeyboardModifier.ShiftModifier:
+                self.textCursor().insertText("\n")
+            else:
+                self.submitted.emit()
+            return
+        super().keyPressEvent(event)
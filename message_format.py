@@ -0,0 +1,199 @@
+import hashlib
+import html
+import re
+from collections import OrderedDict
+
+CACHE_SIZE = 4096  # Formatted messages kept, keyed by a hash of their text
+
+FENCE_OPEN = re.compile(r"^\s*```\s*([\w+#.-]*)\s*$")
+FENCE_CLOSE = re.compile(r"^\s*```\s*$")
+HEADING = re.compile(r"^#{1,6}\s+(.*)$")
+BULLET = re.compile(r"^(\s*)[-*•]\s+(.*)$")
+
+# WhatsApp rules: a marker hugs the text it formats and is not part of a word (so snake_case stays as is)
+INLINE_CODE = re.compile(r"```([^\n]+?)```|`([^`\n]+)`")
+BOLD = re.compile(r"\*\*(\S(?:.*?\S)?)\*\*|(?<![\w*])\*(\S(?:[^*\n]*?\S)?)\*(?![\w*])")
+ITALIC = re.compile(r"(?<![\w_])_(\S(?:[^_\n]*?\S)?)_(?![\w_])")
+STRIKE = re.compile(r"~~(\S(?:.*?\S)?)~~|(?<![\w~])~(\S(?:[^~\n]*?\S)?)~(?![\w~])")
+
+PARAGRAPH_HTML = '<p style="margin: 0 0 6px 0">{}</p>'
+CODE_HTML = ('<p style="margin: 0 0 6px 0; white-space: pre-wrap; font-family: monospace; color: #1e1e1e; '
+             'background-color: #f4f4f4">{}</p>')
+INLINE_CODE_HTML = '<span style="font-family: monospace; background-color: #f0f0f0">{}</span>'
+
+# Syntax highlighting for fenced code: one keyword set for the usual languages, which is enough to read by
+KEYWORDS = frozenset("""
+    and as assert async await break case catch class const continue def default del do elif else enum except
+    export extends false final finally fn for from func function go if impl import in interface is lambda let
+    match mod mut new nil none not null or package pass private protected pub public raise return self static
+    struct super switch this throw throws true try type typeof use var void while with yield
+""".split())
+CODE_TOKEN = (r"(?P<comment>{comments})"
+              r"|(?P<string>\"(?:\\.|[^\"\\\n])*\"?|'(?:\\.|[^'\\\n])*'?)"
+              r"|(?P<number>\b\d+(?:\.\d+)?\b)"
+              r"|(?P<word>\b[A-Za-z_]\w*\b)")
+TOKEN_STYLES = {"comment": "color: #008000; font-style: italic", "string": "color: #a31515",
+                "number": "color: #098658", "keyword": "color: #0000c0; font-weight: bold"}
+DASH_COMMENTS = {"sql", "lua", "haskell"}  # Languages where "--" starts a comment
+HASH_COMMENTS = {"", "python", "py", "sh", "bash", "shell", "zsh", "ruby", "rb", "perl", "r", "yaml", "yml",
+                 "toml", "ini", "conf", "dockerfile", "makefile", "powershell", "ps1", "nim", "elixir"}
+
+_cache = OrderedDict()
+_token_patterns = {}
+
+
+def _span(style, text):
+    return f'<span style="{style}">{html.escape(text)}</span>'
+
+
+def _token_pattern(language):
+    # Comment syntax is the only part that depends on the language ("#include" is not a comment)
+    comments = [r"//[^\n]*", r"/\*.*?(?:\*/|$)"]
+    if language in HASH_COMMENTS:
+        comments.append(r"#[^\n]*")
+    if language in DASH_COMMENTS:
+        comments.append(r"--[^\n]*")
+    key = tuple(comments)
+    pattern = _token_patterns.get(key)
+    if pattern is None:
+        pattern = _token_patterns[key] = re.compile(CODE_TOKEN.format(comments="|".join(comments)), re.S)
+    return pattern
+
+
+def highlight(code, language=""):
+    parts = []
+    position = 0
+    for match in _token_pattern(language.lower()).finditer(code):
+        kind = match.lastgroup
+        token = match.group()
+        if kind == "word":
+            if token.lower() not in KEYWORDS:
+                continue
+            kind = "keyword"
+        parts.append(html.escape(code[position:match.start()]))
+        parts.append(_span(TOKEN_STYLES[kind], token))
+        position = match.end()
+    parts.append(html.escape(code[position:]))
+    return "".join(parts)
+
+
+def format_inline(text):
+    # Escapes one line and applies bold, italic, strikethrough and monospace; code spans are left unformatted
+    spans = []
+
+    def protect(match):
+        spans.append(INLINE_CODE_HTML.format(html.escape(match.group(1) or match.group(2))))
+        return f"\0{len(spans) - 1}\0"
+
+    text = html.escape(INLINE_CODE.sub(protect, text), quote=False)
+    text = BOLD.sub(lambda m: f"<b>{m.group(1) or m.group(2)}</b>", text)
+    text = ITALIC.sub(lambda m: f"<i>{m.group(1)}</i>", text)
+    text = STRIKE.sub(lambda m: f"<s>{m.group(1) or m.group(2)}</s>", text)
+    return re.sub(r"\0(\d+)\0", lambda m: spans[int(m.group(1))], text)
+
+
+def format_block(kind, language, body):
+    # Returns (kind, inner HTML) for a block from split_blocks
+    if kind == "code":
+        return kind, highlight(body[:-1] if body.endswith("\n") else body, language)
+    lines = []
+    for line in body.rstrip("\n").splitlines():
+        heading = HEADING.match(line)
+        bullet = BULLET.match(line)
+        if heading:
+            lines.append(f"<b>{format_inline(heading.group(1))}</b>")
+        elif bullet:
+            lines.append("&nbsp;" * (2 * len(bullet.group(1)) + 2) + "• " + format_inline(bullet.group(2)))
+        else:
+            lines.append(format_inline(line))
+    return kind, "<br>".join(lines)
+
+
+def split_blocks(text, start=0):
+    # Splits text[start:] (which must begin outside a code fence) into paragraphs and fenced code blocks.
+    # Returns (blocks, complete, end): blocks[:complete] end before offset `end` and can no longer change
+    # as text is appended; the rest is the unfinished tail (an unclosed fence is shown as code so far).
+    blocks = []
+    complete = 0
+    end = start
+    paragraph = []
+    code = None  # (language, lines) inside a fence
+    position = start
+    for line in text[start:].splitlines(keepends=True):
+        line_end = position + len(line)
+        finished = line.endswith("\n")
+        stripped = line.rstrip("\r\n")
+        if code is not None:
+            if finished and FENCE_CLOSE.match(stripped):
+                blocks.append(("code", code[0], "".join(code[1])))
+                code = None
+                complete, end = len(blocks), line_end
+            else:
+                code[1].append(line)
+        elif finished and FENCE_OPEN.match(stripped):
+            if paragraph:
+                blocks.append(("text", "", "".join(paragraph)))
+                paragraph = []
+            complete, end = len(blocks), position
+            code = (FENCE_OPEN.match(stripped).group(1), [])
+        elif not stripped.strip():
+            if finished:
+                if paragraph:
+                    blocks.append(("text", "", "".join(paragraph)))
+                    paragraph = []
+                complete, end = len(blocks), line_end
+        else:
+            paragraph.append(line)
+        position = line_end
+    if code is not None:
+        blocks.append(("code", code[0], "".join(code[1])))
+    elif paragraph:
+        blocks.append(("text", "", "".join(paragraph)))
+    return blocks, complete, end
+
+
+def to_html(formatted, prefix=""):
+    # `prefix` (already HTML) starts the first paragraph, e.g. the timestamp and sender
+    parts = []
+    for kind, inner in formatted:
+        if kind == "code":
+            if prefix:
+                parts.append(PARAGRAPH_HTML.format(prefix))
+            parts.append(CODE_HTML.format(inner))
+        else:
+            parts.append(PARAGRAPH_HTML.format(prefix + inner))
+        prefix = ""
+    if prefix or not parts:
+        parts.append(PARAGRAPH_HTML.format(prefix))
+    return "".join(parts)
+
+
+def render_message(text, prefix=""):
+    # Memoized by content hash, so reloading a chat or relaying it out after a resize doesn't re-parse
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    formatted = _cache.get(key)
+    if formatted is None:
+        formatted = [format_block(*block) for block in split_blocks(text)[0]]
+        _cache[key] = formatted
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    return to_html(formatted, prefix)
+
+
+class StreamingFormatter:
+    # Formats a message that is still growing: finished blocks are formatted once, only the tail is re-parsed
+    def __init__(self):
+        self._text = ""
+        self._done = []
+        self._done_end = 0
+
+    def render(self, text, prefix=""):
+        if not text.startswith(self._text):
+            self._done, self._done_end = [], 0  # Replaced rather than extended
+        blocks, complete, end = split_blocks(text, self._done_end)
+        self._done.extend(format_block(*block) for block in blocks[:complete])
+        self._done_end = end
+        self._text = text
+        return to_html(self._done + [format_block(*block) for block in blocks[complete:]], prefix)
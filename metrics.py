@@ -0,0 +1,180 @@
+import bisect
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FILE = "metrics.jsonl"
+PROMETHEUS_FILE = "metrics.prom"
+METRICS_MAX_BYTES = 4 * 1024 * 1024  # metrics.jsonl is moved to metrics.jsonl.1 (replacing it) past this size
+
+# Upper bounds of the histogram buckets; the last bucket takes everything above
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160, 320)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th value (the max for the overflow bucket)
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self):
+        return {"count": self.count, "sum": self.sum, "mean": self.sum / self.count if self.count else 0.0,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "max": self.max}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _label_text(labels, extra=()):
+    items = list(labels) + list(extra)
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}" if items else ""
+
+
+class Metrics:
+    # Thread-safe registry of histograms and counters, keyed by name and labels (e.g. model)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self.profile_next = False  # Set from the diagnostics panel: profile the next request
+        self._exported = None  # Histograms and counters of the last snapshot appended to metrics.jsonl
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        with self._lock:
+            histogram = self._histograms.get(_key(name, labels))
+            if histogram is None:
+                histogram = self._histograms[_key(name, labels)] = Histogram(buckets)
+            histogram.observe(value)
+
+    def count(self, name, value=1, **labels):
+        with self._lock:
+            key = _key(name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def take_profile_request(self):
+        with self._lock:
+            profile, self.profile_next = self.profile_next, False
+            return profile
+
+    def run(self, fn, directory):
+        # Calls fn(), under cProfile if the diagnostics panel asked for the next request to be profiled
+        return profile_call(fn, directory) if self.take_profile_request() else fn()
+
+    def record_request(self, model, stream, started, report, outcome):
+        # One API call: latency, time to first token, generation speed and token usage.
+        # `report` is the dict filled in by chat_requests (usage and, when streaming, first_token).
+        finished = time.perf_counter()
+        self.observe("request_seconds", finished - started, model=model, stream="yes" if stream else "no")
+        generating_since = report.get("first_token", started)
+        if "first_token" in report:
+            self.observe("ttft_seconds", generating_since - started, model=model)
+        completion_tokens = report.get("completion_tokens")
+        if completion_tokens and finished > generating_since:
+            self.observe("tokens_per_second", completion_tokens / (finished - generating_since), RATE_BUCKETS,
+                         model=model)
+        for name in ("prompt_tokens", "completion_tokens"):
+            if report.get(name):
+                self.count(name + "_total", report[name], model=model)
+        self.count("requests_total", model=model, outcome=outcome)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "time": time.time(),
+                "histograms": [{"name": name, "labels": dict(labels), **histogram.summary()}
+                               for (name, labels), histogram in sorted(self._histograms.items())],
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self._counters.items())],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in typed:  # One TYPE line per metric, before its first series
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_label_text(labels)} {histogram.count}")
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}{_label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory):
+        # Appends a snapshot to metrics.jsonl if anything changed since the last one, and rewrites
+        # metrics.prom (for a node exporter textfile collector)
+        snapshot = self.snapshot()
+        values = (snapshot["histograms"], snapshot["counters"])
+        if values != self._exported:
+            path = os.path.join(directory, METRICS_FILE)
+            if os.path.exists(path) and os.path.getsize(path) > METRICS_MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(snapshot) + "\n")
+            self._exported = values
+        prometheus_path = os.path.join(directory, PROMETHEUS_FILE)
+        with open(prometheus_path + ".tmp", "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus())
+        os.replace(prometheus_path + ".tmp", prometheus_path)
+
+
+def profile_call(fn, directory, name="request"):
+    # Runs fn() under cProfile (this thread only) and saves <name>-<time>.prof plus a readable .txt summary
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn)
+    finally:
+        base = os.path.join(directory, f"profile-{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+        profiler.dump_stats(base + ".prof")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(30)
+        with open(base + ".txt", "w", encoding="utf-8") as file:
+            file.write(text.getvalue())
@@ -0,0 +1,90 @@
+import importlib.metadata
+import os
+
+SDK_ENV = "MISTRAL_SDK"  # "v0" or "v1" forces a backend; otherwise the installed mistralai decides
+
+
+class MistralBackend:
+    # One generation of the mistralai SDK. The SDK itself is imported by create_client, i.e. when the
+    # first client is built (first send or connection warm-up), never at startup.
+    name = None
+
+    def create_client(self, api_key, base_url, http_client):
+        raise NotImplementedError
+
+    def complete(self, client, model, messages):
+        # Returns the response (choices[0].message.content, usage)
+        raise NotImplementedError
+
+    def stream(self, client, model, messages):
+        # Yields the streamed chunks (choices[0].delta.content; usage on the last one)
+        raise NotImplementedError
+
+
+class V1Backend(MistralBackend):
+    # mistralai >= 1.0: Mistral(...).chat.complete / .chat.stream
+    name = "v1"
+
+    def create_client(self, api_key, base_url, http_client):
+        try:
+            from mistralai.client import Mistral  # Where later releases moved it
+        except ImportError:
+            from mistralai import Mistral  # 1.x
+        return Mistral(api_key=api_key, server_url=base_url, client=http_client)
+
+    def complete(self, client, model, messages):
+        return client.chat.complete(model=model, messages=messages)
+
+    def stream(self, client, model, messages):
+        return (event.data for event in client.chat.stream(model=model, messages=messages))
+
+
+class V0Backend(MistralBackend):
+    # mistralai <= 0.4.2: MistralClient(...).chat / .chat_stream
+    name = "v0"
+
+    def create_client(self, api_key, base_url, http_client):
+        from mistralai.client import MistralClient
+        client = MistralClient(api_key=api_key, endpoint=base_url, max_retries=0)  # RequestScheduler retries
+        # Route the SDK through the pooled keep-alive HTTP client instead of its private one
+        client._client.close()
+        client._client = http_client
+        return client
+
+    def complete(self, client, model, messages):
+        return client.chat(model=model, messages=messages)
+
+    def stream(self, client, model, messages):
+        return client.chat_stream(model=model, messages=messages)
+
+
+BACKENDS = {"v0": V0Backend, "v1": V1Backend}
+
+_backend = None
+
+
+def installed_sdk_version():
+    # Read from the package metadata, which is much cheaper than importing the SDK
+    try:
+        return importlib.metadata.version("mistralai")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def detect_backend_name():
+    forced = os.environ.get(SDK_ENV)
+    if forced:
+        if forced not in BACKENDS:
+            raise ValueError(f"{SDK_ENV} must be one of {', '.join(sorted(BACKENDS))}, not {forced!r}")
+        return forced
+    version = installed_sdk_version()
+    if version is None:
+        return "v1"  # Not installed: the first request fails with the ImportError
+    return "v0" if int(version.split(".")[0]) < 1 else "v1"
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS[detect_backend_name()]()
+    return _backend
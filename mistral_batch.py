@@ -0,0 +1,172 @@
+"""Runs a JSONL file of prompts against the Mistral API without the GUI.
+
+    python mistral_batch.py prompts.jsonl results.jsonl --concurrency 8
+
+Each input line is {"id": ..., "prompt": ...} with optional "model" and "system_prompt".
+Results are appended to the output file as they complete: {"id", "model", "response", "error", "elapsed_ms"}.
+Re-running with the same output file skips the prompts that already succeeded, so a crashed run resumes.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from chat_requests import DEFAULT_MODEL, DEFAULT_SYSTEM_PROMPT, create_client, get_response
+from client_pool import ClientPool
+from request_scheduler import RequestScheduler
+from context_builder import ContextBuilder
+
+
+def read_jsonl(path):
+    # Yields (line number, record); unreadable lines (e.g. torn by a crash) are skipped
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                print(f"{path}:{number}: skipping invalid JSON", file=sys.stderr)
+
+
+def completed_ids(path):
+    # Ids that already have a successful result in the output file
+    if not os.path.exists(path):
+        return set()
+    return {record.get("id") for _, record in read_jsonl(path) if record.get("error") is None}
+
+
+class ResultWriter:
+    # Appends one JSON line per result in completion order; each line is flushed so a crash loses nothing written
+    def __init__(self, path, fsync=False):
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file = open(path, "a+b")
+        if self._file.tell() > 0:
+            self._file.seek(-1, os.SEEK_END)
+            if self._file.read(1) != b"\n":
+                self._file.write(b"\n")  # Terminate a line torn by a crash
+
+    def write(self, record):
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class BatchRunner:
+    def __init__(self, api_key, model=DEFAULT_MODEL, system_prompt=DEFAULT_SYSTEM_PROMPT, concurrency=4,
+                 rate=5.0, max_retries=4):
+        self.api_key = api_key
+        self.model = model
+        self.system_prompt = system_prompt
+        self.concurrency = concurrency
+        # One pooled client shared by every worker: connections are reused across prompts
+        self.client_pool = ClientPool(create_client, max_keepalive=max(8, concurrency))
+        self.context_builder = ContextBuilder()
+        # Keeps the run under the API's rate limit; 429s and transient errors are retried with backoff
+        self.scheduler = RequestScheduler(rate=rate, burst=concurrency, max_retries=max_retries)
+
+    def prepare(self, number, record):
+        # Runs on the reading thread (the context builder keeps per-call state)
+        model = record.get("model", self.model)
+        system_prompt = record.get("system_prompt", self.system_prompt)
+        messages = self.context_builder.build([], system_prompt, record.get("prompt", ""), model)
+        return record.get("id", number), model, messages
+
+    def run_one(self, prompt_id, model, messages):
+        start = time.perf_counter()
+        try:
+            response, error = get_response(
+                self.client_pool, messages, self.api_key, model, scheduler=self.scheduler), None
+        except Exception as e:
+            response, error = None, str(e)
+        return {"id": prompt_id, "model": model, "response": response, "error": error,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    def run(self, input_path, output_path, progress=None):
+        # Keeps at most 2 × concurrency prompts in flight, so huge input files aren't read into memory
+        done = completed_ids(output_path)
+        writer = ResultWriter(output_path)
+        counts = {"ok": 0, "failed": 0, "skipped": 0}
+        start = time.perf_counter()
+        pending = set()
+
+        def collect(finished):
+            for future in finished:
+                result = future.result()
+                writer.write(result)
+                counts["failed" if result["error"] is not None else "ok"] += 1
+                if progress is not None:
+                    progress(counts, time.perf_counter() - start)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+                try:
+                    for number, record in read_jsonl(input_path):
+                        prompt_id, model, messages = self.prepare(number, record)
+                        if prompt_id in done:
+                            counts["skipped"] += 1
+                            continue
+                        pending.add(executor.submit(self.run_one, prompt_id, model, messages))
+                        if len(pending) >= 2 * self.concurrency:
+                            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            collect(finished)
+                    while pending:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(finished)
+                except KeyboardInterrupt:
+                    for future in pending:
+                        future.cancel()  # Requests already running finish; their results are dropped
+                    raise
+        finally:
+            writer.close()
+            self.client_pool.close_all()
+        return counts
+
+
+def print_progress(counts, elapsed):
+    finished = counts["ok"] + counts["failed"]
+    rate = finished / elapsed if elapsed else 0
+    print(f"\r{counts['ok']} ok, {counts['failed']} failed, {counts['skipped']} skipped ({rate:.1f}/s)",
+          end="", file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of prompts against the Mistral API")
+    parser.add_argument("input", help="JSONL file with one {\"id\", \"prompt\"} object per line")
+    parser.add_argument("output", help="JSONL file the results are appended to (also used to resume)")
+    parser.add_argument("--api-key", default=os.environ.get("MISTRAL_API_KEY"),
+                        help="defaults to the MISTRAL_API_KEY environment variable")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--system-prompt", default=DEFAULT_SYSTEM_PROMPT)
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at once")
+    parser.add_argument("--rate", type=float, default=5.0, help="requests per second allowed for the API key")
+    parser.add_argument("--max-retries", type=int, default=4)
+    args = parser.parse_args()
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or MISTRAL_API_KEY)")
+
+    runner = BatchRunner(args.api_key, args.model, args.system_prompt, max(1, args.concurrency), args.rate,
+                         args.max_retries)
+    try:
+        counts = runner.run(args.input, args.output, print_progress)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run again with the same output file to resume.", file=sys.stderr)
+        sys.exit(130)
+    stats = runner.scheduler.stats.snapshot()
+    print(f"\n{stats['requests']} requests, {stats['retries']} retries, {stats['coalesced']} shared, "
+          f"{stats['wait_seconds']:.1f} s waiting for the rate limit", file=sys.stderr)
+    sys.exit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
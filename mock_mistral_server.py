@@ -0,0 +1,178 @@
+"""Local stand-in for the Mistral chat API, for benchmarks and offline development.
+
+    python mock_mistral_server.py --port 8089 --latency 0.2 --tokens-per-second 50
+    MISTRAL_BASE_URL=http://127.0.0.1:8089 python chat_app.py
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("the quick brown fox jumps over the lazy dog while a mock model streams tokens at a steady rate "
+         "so that latency numbers stay comparable between runs").split()
+MODELS = ["mistral-large", "mistral-small", "mistral-next", "codestral-latest"]
+
+
+class MockSettings:
+    def __init__(self, latency=0.0, tokens_per_second=0.0, reply_tokens=200, error_rate=0.0, error_status=500,
+                 retry_after=1):
+        self.latency = latency  # Seconds before the response headers (time to first token)
+        self.tokens_per_second = tokens_per_second  # 0 sends the whole reply at once
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate  # Fraction of chat requests answered with error_status
+        self.error_status = error_status
+        self.retry_after = retry_after  # Sent with 429 and 503 errors
+
+
+def make_reply(tokens):
+    return [word + " " for word in itertools.islice(itertools.cycle(WORDS), tokens)]
+
+
+class MockMistralHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    @property
+    def settings(self):
+        return self.server.settings
+
+    def log_message(self, format, *args):
+        pass  # Quiet: the benchmarks print their own report
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": m, "object": "model"} for m in MODELS]})
+        else:
+            self._send_json(404, {"message": "Not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"message": "Invalid JSON"})
+            return
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"message": "Not found"})
+            return
+        self.server.count_request()
+        time.sleep(self.settings.latency)
+        if random.random() < self.settings.error_rate:
+            status = self.settings.error_status
+            headers = {"Retry-After": str(self.settings.retry_after)} if status in (429, 503) else None
+            self._send_json(status, {"object": "error", "message": "Injected error", "type": "mock_error"}, headers)
+            return
+        model = request.get("model", MODELS[0])
+        prompt_tokens = sum(len(m.get("content") or "") for m in request.get("messages", [])) // 4
+        tokens = make_reply(self.settings.reply_tokens)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+        completion_id = uuid.uuid4().hex
+        created = int(time.time())
+        if not request.get("stream"):
+            time.sleep(len(tokens) / self.settings.tokens_per_second if self.settings.tokens_per_second else 0)
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": "stop"}],
+                "usage": usage})
+            return
+
+        # Server-sent events, one token per event, sent with chunked transfer encoding
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        interval = 1 / self.settings.tokens_per_second if self.settings.tokens_per_second else 0
+        try:
+            for i, token in enumerate(tokens):
+                delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                event = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                self._write_chunk(f"data: {json.dumps(event)}\n\n")
+                if interval:
+                    time.sleep(interval)
+            event = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": ""}, "finish_reason": "stop"}], "usage": usage}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # The client cancelled the stream
+
+
+class MockMistralServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, settings=None):
+        super().__init__((host, port), MockMistralHandler)
+        self.settings = settings or MockSettings()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        # Serves on a background thread; port=0 picks a free port (see `url`)
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-mistral", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Mistral chat completion API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--reply-tokens", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+    settings = MockSettings(args.latency, args.tokens_per_second, args.reply_tokens, args.error_rate,
+                            args.error_status, args.retry_after)
+    server = MockMistralServer(args.host, args.port, settings)
+    print(f"Mock Mistral API on {server.url} (set MISTRAL_BASE_URL to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+FANOUT_LOG = "fanout.jsonl"
+
+
+class ModelAnswer:
+    def __init__(self, model):
+        self.model = model
+        self.text = ""
+        self.status = "running"  # ok, error, cancelled, or lost (cancelled because another model was faster)
+        self.error = None
+        self.won = False  # First model to complete
+        self.latency = None  # Seconds from the send until the answer was complete
+        self.first_token = None  # Seconds until the first streamed token
+        self.report = {}  # Token usage and first_token time, filled in by chat_requests
+
+    def to_dict(self):
+        return {"model": self.model, "status": self.status, "won": self.won, "latency": self.latency,
+                "first_token": self.first_token, "prompt_tokens": self.report.get("prompt_tokens"),
+                "completion_tokens": self.report.get("completion_tokens"), "chars": len(self.text),
+                "error": self.error}
+
+
+class FanOutResult:
+    def __init__(self, answers, hedge, preferred=None):
+        self.answers = answers  # In the order the models were selected
+        self.hedge = hedge
+        self.preferred = preferred  # Model whose answer goes into the chat when every model finishes
+        self.winner = None
+
+    def reply(self):
+        # The answer kept in the chat: the winner when hedging, else the preferred model's (or the fastest)
+        answers = {answer.model: answer for answer in self.answers if answer.status == "ok"}
+        if not self.hedge and self.preferred in answers:
+            return answers[self.preferred]
+        return answers.get(self.winner)
+
+    def log_record(self):
+        return {"time": time.time(), "hedge": self.hedge, "winner": self.winner,
+                "answers": [answer.to_dict() for answer in self.answers]}
+
+
+def fan_out(ask, models, cancel_token, hedge=False, preferred=None, on_chunk=None, on_answer=None):
+    # Sends one prompt to every model at once. ask(model, token, report) -> text runs one request and
+    # passes streamed tokens to token.publish. With hedge=True the first complete answer wins and the
+    # other requests are cancelled. on_chunk(model, text) and on_answer(answer) are called from the
+    # request threads.
+    answers = [ModelAnswer(model) for model in models]
+    tokens = [cancel_token.child() for _ in models]
+    result = FanOutResult(answers, hedge, preferred)
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def run(answer, token):
+        if on_chunk is not None:
+            token.publish = lambda text: on_chunk(answer.model, text)
+        try:
+            if not token.cancelled:  # A winner may already be in before this request was even sent
+                answer.text = ask(answer.model, token, answer.report)
+        except Exception as e:
+            answer.error = str(e)
+        answer.latency = time.perf_counter() - started
+        if "first_token" in answer.report:
+            answer.first_token = answer.report["first_token"] - started
+        with lock:
+            if token.cancelled:
+                answer.status = "cancelled" if cancel_token.cancelled or result.winner is None else "lost"
+            elif answer.error is not None:
+                answer.status = "error"
+            else:
+                answer.status = "ok"
+                if result.winner is None:
+                    result.winner = answer.model
+                    answer.won = True
+                    if hedge:
+                        for other_token in tokens:
+                            if other_token is not token:
+                                other_token.cancel()
+        if on_answer is not None:
+            on_answer(answer)
+
+    with ThreadPoolExecutor(max_workers=len(models), thread_name_prefix="fanout") as executor:
+        for answer, token in zip(answers, tokens):
+            executor.submit(run, answer, token)
+    return result
+
+
+def log_fanout(directory, record):
+    # fanout.jsonl: one line per multi-model send (latencies, winner) and per "Prefer" vote
+    with open(os.path.join(directory, FANOUT_LOG), "a", encoding="utf-8") as file:
+        file.write(json.dumps(record, ensure_ascii=False) + "\n")
@@ -0,0 +1,141 @@
+import itertools
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.publish = lambda text: None  # Replaced by the task to stream partial output
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def wait(self, timeout):
+        # Sleeps up to timeout seconds, waking early on cancel; returns True if cancelled
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback):
+        # Callbacks registered after cancellation run immediately so a late client still gets closed.
+        # Returns a function that unregisters the callback, for tokens that outlive many requests.
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass  # Already run by cancel()
+
+    def child(self):
+        # A token cancelled along with this one that can also be cancelled on its own
+        token = CancelToken()
+        self.on_cancel(token.cancel)
+        return token
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+
+class _TaskSignals(QObject):
+    chunk = pyqtSignal(int, str)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class RequestTask(QRunnable):
+    def __init__(self, request_id, fn, token, signals):
+        super().__init__()
+        self.request_id = request_id
+        self.fn = fn
+        self.token = token
+        self.signals = signals
+
+    def run(self):
+        # Runs on a pool thread: never touch widgets here, only emit signals
+        self.token.publish = lambda text: self.signals.chunk.emit(self.request_id, text)
+        try:
+            result = self.fn(self.token)
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+        else:
+            self.signals.finished.emit(self.request_id, result)
+
+
+class RequestEngine(QObject):
+    chunk = pyqtSignal(int, str)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+    def __init__(self, parent=None, max_workers=4):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_workers)
+        self._ids = itertools.count(1)
+        self._tokens = {}
+        self._signals = _TaskSignals(self)
+        self._signals.chunk.connect(self._on_task_chunk)
+        self._signals.finished.connect(self._on_task_finished)
+        self._signals.failed.connect(self._on_task_failed)
+
+    def submit(self, fn):
+        # fn(token) is called on a worker thread; its return value is delivered via `finished`
+        # and anything it passes to token.publish() is delivered via `chunk`
+        request_id = next(self._ids)
+        token = CancelToken()
+        self._tokens[request_id] = token
+        self._pool.start(RequestTask(request_id, fn, token, self._signals))
+        return request_id
+
+    def cancel(self, request_id):
+        token = self._tokens.pop(request_id, None)
+        if token is None:
+            return False
+        token.cancel()
+        self.cancelled.emit(request_id)
+        return True
+
+    def cancel_all(self):
+        for request_id in list(self._tokens):
+            self.cancel(request_id)
+
+    def is_active(self, request_id):
+        return request_id in self._tokens
+
+    def shutdown(self, timeout_ms=3000):
+        self.cancel_all()
+        self._pool.waitForDone(timeout_ms)
+
+    @pyqtSlot(int, str)
+    def _on_task_chunk(self, request_id, text):
+        if request_id in self._tokens:
+            self.chunk.emit(request_id, text)
+
+    @pyqtSlot(int, object)
+    def _on_task_finished(self, request_id, result):
+        # Results of cancelled requests are dropped; `cancelled` was already emitted
+        if self._tokens.pop(request_id, None) is not None:
+            self.finished.emit(request_id, result)
+
+    @pyqtSlot(int, str)
+    def _on_task_failed(self, request_id, error):
+        if self._tokens.pop(request_id, None) is not None:
+            self.failed.emit(request_id, error)
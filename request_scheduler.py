@@ -0,0 +1,192 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class RequestCancelled(Exception):
+    pass
+
+
+def _status_and_headers(error):
+    # Works for both SDKs (mistralai 1.x SDKError, 0.4.x MistralAPIException) and raw httpx errors
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    response = getattr(error, "raw_response", None) or getattr(error, "response", None)
+    headers = getattr(error, "headers", None) or getattr(response, "headers", None) or {}
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    return status, headers
+
+
+def parse_retry_after(value):
+    # Retry-After is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay_hint(error):
+    # Returns (retryable, seconds the server asked us to wait or None)
+    status, headers = _status_and_headers(error)
+    if status is not None:
+        return status in RETRY_STATUSES, parse_retry_after(headers.get("Retry-After") or headers.get("retry-after"))
+    # No HTTP status: connection refused/reset or timed out before a response
+    name = type(error).__name__
+    return any(word in name for word in ("Connect", "Timeout", "Network", "Transport", "Protocol")), None
+
+
+class TokenBucket:
+    # Allows `rate` requests per second on average, with bursts of up to `capacity`
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Takes a token (possibly one that only refills later) and returns how long to wait for it
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class SchedulerStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.wait_seconds = 0.0  # Time spent waiting for the rate limiter
+        self.max_wait_seconds = 0.0
+        self.backoff_seconds = 0.0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {"requests": self.requests, "retries": self.retries, "coalesced": self.coalesced,
+                    "failed": self.failed, "wait_seconds": self.wait_seconds,
+                    "max_wait_seconds": self.max_wait_seconds, "backoff_seconds": self.backoff_seconds}
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestScheduler:
+    # Runs API calls under a per-key rate limit, retries rate-limited and transient failures with
+    # jittered exponential backoff, and lets identical requests in flight share one call
+    def __init__(self, rate=2.0, burst=4, max_retries=4, base_delay=1.0, max_delay=30.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = SchedulerStats()
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._flights = {}
+
+    def _bucket(self, api_key):
+        with self._lock:
+            bucket = self._buckets.get(api_key)
+            if bucket is None:
+                bucket = self._buckets[api_key] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def _sleep(self, seconds, cancel_token):
+        if cancel_token is None:
+            time.sleep(seconds)
+        elif cancel_token.wait(seconds):
+            raise RequestCancelled()
+
+    def backoff(self, attempt, retry_after=None):
+        # "Full jitter": a random delay up to the exponential cap, but never less than the server asked for
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def run(self, api_key, fn, key=None, cancel_token=None, can_retry=None):
+        # Calls fn() and returns its result. Requests with the same `key` (e.g. a hash of model and
+        # messages) that arrive while one is running wait for it instead of calling the API again.
+        # `can_retry()` is checked before each retry (a stream that has shown tokens must not restart).
+        if key is not None:
+            with self._lock:
+                flight = self._flights.get(key)
+                owner = flight is None
+                if owner:
+                    flight = self._flights[key] = _Flight()
+            if not owner:
+                self.stats.add(coalesced=1)
+                while not flight.done.wait(0.1):
+                    if cancel_token is not None and cancel_token.cancelled:
+                        raise RequestCancelled()
+                if flight.error is None:
+                    return flight.result
+                if not isinstance(flight.error, RequestCancelled):
+                    raise flight.error
+                flight = None  # The request we waited for was cancelled: send our own
+        else:
+            flight = None
+        try:
+            result = self._run_with_retries(api_key, fn, cancel_token, can_retry)
+        except Exception as e:
+            if flight is not None:
+                flight.error = RequestCancelled() if cancel_token is not None and cancel_token.cancelled else e
+            raise
+        else:
+            if flight is not None:
+                flight.result = result
+            return result
+        finally:
+            if flight is not None:
+                with self._lock:
+                    self._flights.pop(key, None)
+                flight.done.set()
+
+    def _run_with_retries(self, api_key, fn, cancel_token, can_retry):
+        bucket = self._bucket(api_key)
+        attempt = 0
+        while True:
+            wait = bucket.reserve()
+            self.stats.record_wait(wait)
+            if wait:
+                self._sleep(wait, cancel_token)
+            self.stats.add(requests=1)
+            try:
+                return fn()
+            except Exception as e:
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise
+                retryable, retry_after = retry_delay_hint(e)
+                if not retryable or attempt >= self.max_retries or (can_retry is not None and not can_retry()):
+                    self.stats.add(failed=1)
+                    raise
+                delay = self.backoff(attempt, retry_after)
+                self.stats.add(retries=1, backoff_seconds=delay)
+                self._sleep(delay, cancel_token)
+                attempt += 1
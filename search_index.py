@@ -0,0 +1,125 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from chat_archive import chat_files, open_chat_file
+
+SEARCH_FILE = "search.sqlite3"
+
+
+def to_match_query(text):
+    # Quote every term so user input can't break FTS5 syntax; the last term matches as a prefix
+    terms = re.findall(r"\w+", text)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+
+class SearchIndex:
+    # SQLite FTS5 index over every stored message, kept up to date one appended turn at a time
+    def __init__(self, directory, pattern="chat_history_*.jsonl"):
+        self.directory = directory
+        self.pattern = pattern
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, SEARCH_FILE), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # The FTS table holds only the text; message_meta (same rowid) locates it and is indexed by chat
+        self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5(content)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS message_meta ("
+            "id INTEGER PRIMARY KEY, chat TEXT NOT NULL, position INTEGER NOT NULL, role TEXT, timestamp TEXT)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS message_meta_chat ON message_meta (chat)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS indexed_chats (name TEXT PRIMARY KEY, message_count INTEGER NOT NULL)")
+        self._db.commit()
+
+    def _indexed_count(self, name):
+        row = self._db.execute("SELECT message_count FROM indexed_chats WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def add_messages(self, name, entries):
+        with self._lock:
+            start = self._indexed_count(name)
+            for i, entry in enumerate(entries):
+                cursor = self._db.execute(
+                    "INSERT INTO message_meta (chat, position, role, timestamp) VALUES (?, ?, ?, ?)",
+                    (name, start + i, entry.get("role", ""), entry.get("timestamp", "")))
+                self._db.execute(
+                    "INSERT INTO messages (rowid, content) VALUES (?, ?)", (cursor.lastrowid, entry.get("content", "")))
+            self._db.execute(
+                "INSERT OR REPLACE INTO indexed_chats (name, message_count) VALUES (?, ?)",
+                (name, start + len(entries)))
+            self._db.commit()
+
+    def remove_chat(self, name):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM messages WHERE rowid IN (SELECT id FROM message_meta WHERE chat = ?)", (name,))
+            self._db.execute("DELETE FROM message_meta WHERE chat = ?", (name,))
+            self._db.execute("DELETE FROM indexed_chats WHERE name = ?", (name,))
+            self._db.commit()
+
+    def reindex_chat(self, name, entries):
+        self.remove_chat(name)
+        self.add_messages(name, entries)
+
+    def catch_up(self, message_counts=None, limit=None):
+        # Indexes messages written while the index didn't exist (or by another copy of the app), at most
+        # `limit` of them per call; returns True if there is more to do.
+        # Only the unindexed tail of each chat is read; chats whose count (from the catalog) matches are skipped.
+        # Archived chats are read from their compressed copies.
+        with self._lock:
+            indexed = dict(self._db.execute("SELECT name, message_count FROM indexed_chats"))
+        on_disk = set()
+        added = 0
+        for name, path in chat_files(self.directory, self.pattern):
+            on_disk.add(name)
+            skip = indexed.get(name, 0)
+            if message_counts is not None and message_counts.get(name) == skip:
+                continue
+            if limit is not None and added >= limit:
+                return True
+            entries = []
+            try:
+                with open_chat_file(path) as file:
+                    for line in file:
+                        if not line.strip():
+                            continue
+                        if skip:
+                            skip -= 1
+                            continue
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            pass
+                        if limit is not None and added + len(entries) >= limit:
+                            break
+            except FileNotFoundError:
+                continue  # Archived, restored or deleted since the listing; the next catch-up finds it
+            if entries:
+                self.add_messages(name, entries)
+                added += len(entries)
+        for name in indexed.keys() - on_disk:
+            if message_counts is None or name not in message_counts:  # Archived chats are still in the catalog
+                self.remove_chat(name)
+        return False
+
+    def search(self, text, limit=50):
+        # Returns [(chat, position, role, snippet)], best matches first
+        query = to_match_query(text)
+        if query is None:
+            return []
+        with self._lock:
+            try:
+                return self._db.execute(
+                    "SELECT meta.chat, meta.position, meta.role, snippet(messages, 0, '[', ']', '…', 12) "
+                    "FROM messages JOIN message_meta AS meta ON meta.id = messages.rowid "
+                    "WHERE messages MATCH ? ORDER BY messages.rank LIMIT ?", (query, limit)).fetchall()
+            except sqlite3.OperationalError:
+                return []
+
+    def close(self):
+        with self._lock:
+            self._db.close()
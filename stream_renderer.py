@@ -0,0 +1,56 @@
+from PyQt6.QtCore import QObject, QTimer
+
+
+class StreamRenderer(QObject):
+    # Coalesces streamed tokens and writes them to the transcript at most once per interval
+    def __init__(self, transcript_view, interval_ms=30, parent=None):
+        super().__init__(parent)
+        self.transcript_view = transcript_view
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+        self._sender = None
+        self._timestamp = None
+        self._started = False
+        self._pending = []
+        self._parts = []
+        self.active = False
+
+    def begin(self, sender, timestamp):
+        self._sender = sender
+        self._timestamp = timestamp
+        self._started = False
+        self._pending = []
+        self._parts = []
+        self.active = True
+
+    def feed(self, text):
+        if not self.active or not text:
+            return
+        self._pending.append(text)
+        self._parts.append(text)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        if not self._pending:
+            self._timer.stop()  # Idle: stop ticking until the next token arrives
+            return
+        text = "".join(self._pending)
+        self._pending = []
+        if not self._started:
+            # The message row is added lazily, with the first batch of tokens
+            self.transcript_view.append_message(self._sender, text, self._timestamp)
+            self._started = True
+        else:
+            self.transcript_view.append_to_last(text)
+
+    def text(self):
+        return "".join(self._parts)
+
+    def finish(self):
+        # Writes whatever is still buffered and returns the full streamed text
+        self.flush()
+        self._timer.stop()
+        self.active = False
+        return self.text()
@@ -0,0 +1,274 @@
+import html
+import itertools
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QPersistentModelIndex, QPointF, QSize, QTimer, pyqtSignal
+from PyQt6.QtGui import (QAction, QColor, QFont, QFontMetrics, QGuiApplication, QKeySequence, QStaticText, QTextOption,
+                         QTransform)
+from PyQt6.QtWidgets import QAbstractItemView, QListView, QStyle, QStyledItemDelegate
+from blob_store import attachment_label
+from message_format import StreamingFormatter, render_message
+
+MESSAGE_ROLE = Qt.ItemDataRole.UserRole
+SENDER_COLORS = {"You": QColor("blue"), "AI": QColor("green")}
+PADDING = 6
+
+_uids = itertools.count()
+
+
+def display_sender(sender):
+    return "You" if sender in ("You", "user") else "AI"
+
+
+def display_content(entry):
+    # Attached files are shown by name; their text stays in the blob store
+    content = entry.get("content", "")
+    if entry.get("attachments"):
+        label = attachment_label(entry["attachments"])
+        return f"{content}\n{label}" if content else label
+    return content
+
+
+class TranscriptModel(QAbstractListModel):
+    # Messages of the loaded window of a chat; older pages are prepended as the user scrolls up
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._messages = []
+        self.has_older = False
+
+    def _make(self, sender, content, timestamp, cached=False):
+        return {"uid": next(_uids), "sender": display_sender(sender), "content": content, "timestamp": timestamp,
+                "cached": cached}
+
+    def _from_entries(self, entries):
+        return [self._make(e.get("role", ""), display_content(e), e.get("timestamp", ""), e.get("cached", False))
+                for e in entries]
+
+    def message(self, row):
+        # Direct access for the delegate; data(MESSAGE_ROLE) converts the dict on every call
+        return self._messages[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._messages)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        message = self._messages[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            marker = " (cached)" if message["cached"] else ""  # Replayed from the response cache
+            return f"[{message['timestamp']}] {message['sender']}{marker}: {message['content']}"
+        if role == MESSAGE_ROLE:
+            return message
+        return None
+
+    def set_messages(self, entries, has_older=False):
+        self.beginResetModel()
+        self._messages = self._from_entries(entries)
+        self.has_older = has_older
+        self.endResetModel()
+
+    def prepend_messages(self, entries, has_older):
+        self.has_older = has_older
+        if not entries:
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(entries) - 1)
+        self._messages[:0] = self._from_entries(entries)
+        self.endInsertRows()
+
+    def append_message(self, sender, content, timestamp, cached=False):
+        row = len(self._messages)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._messages.append(self._make(sender, content, timestamp, cached))
+        self.endInsertRows()
+
+    def append_to_last(self, text):
+        if not self._messages:
+            return
+        message = self._messages[-1]
+        message["content"] += text
+        message.setdefault("formatter", StreamingFormatter())  # Streaming: only the new tail is re-parsed
+        index = self.index(len(self._messages) - 1)
+        self.dataChanged.emit(index, index)
+
+
+class MessageDelegate(QStyledItemDelegate):
+    # Rows that have never been painted get a size estimated from their plain text; the rich-text layout
+    # is built when a row is first painted (then reused for its size hint), so only visible rows pay for it
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+        self._layouts = {}  # uid -> ((width, length), QStaticText) for rows painted at the current width
+        self._estimates = {}  # uid -> ((width, length), QSize)
+        self._width = None
+        self._metrics = None  # (font, QFontMetrics) used for the estimates
+
+    def clear_cache(self):
+        self._layouts = {}
+        self._estimates = {}
+
+    def _html(self, message):
+        # WhatsApp/Markdown formatting; the plain DisplayRole text is still what Copy puts on the clipboard
+        marker = " (cached)" if message["cached"] else ""
+        prefix = html.escape(f"[{message['timestamp']}] {message['sender']}{marker}: ")
+        formatter = message.get("formatter")
+        if formatter is not None:
+            return formatter.render(message["content"], prefix)
+        return render_message(message["content"], prefix)
+
+    def _text_width(self):
+        width = max(50, self.view.viewport().width() - 2 * PADDING)
+        if width != self._width:
+            self._width = width
+            self._layouts = {}  # Re-measured as the rows are painted again
+        return width
+
+    def _estimate(self, message, font, width):
+        # Wrapped line count from the average glyph width; corrected once the row is painted
+        key = (width, len(message["content"]))
+        cached = self._estimates.get(message["uid"])
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        if self._metrics is None or self._metrics[0] != font:
+            self._metrics = (QFont(font), QFontMetrics(font))  # A copy: option.font dies with the option
+        metrics = self._metrics[1]
+        per_line = max(1, width // max(1, metrics.averageCharWidth()))
+        prefix = len(message["timestamp"]) + len(message["sender"]) + 14
+        lines = 0
+        for i, line in enumerate(message["content"].split("\n")):
+            lines += max(1, -(-(len(line) + (prefix if i == 0 else 0)) // per_line))
+        size = QSize(width, lines * metrics.lineSpacing())
+        self._estimates[message["uid"]] = (key, size)
+        return size
+
+    def _layout(self, index, font):
+        message = self.view.transcript.message(index.row())
+        width = self._text_width()
+        key = (width, len(message["content"]))
+        cached = self._layouts.get(message["uid"])
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        static_text = QStaticText(self._html(message))
+        static_text.setTextFormat(Qt.TextFormat.RichText)
+        static_text.setTextWidth(width)
+        option = QTextOption()
+        option.setWrapMode(QTextOption.WrapMode.WrapAtWordBoundaryOrAnywhere)
+        static_text.setTextOption(option)
+        static_text.prepare(QTransform(), font)
+        self._layouts[message["uid"]] = (key, static_text)
+        return static_text
+
+    def sizeHint(self, option, index):
+        message = self.view.transcript.message(index.row())
+        if message["uid"] in self._layouts:
+            size = self._layout(index, option.font).size()  # Painted before: exact, even while it streams
+        else:
+            size = self._estimate(message, option.font, self._text_width())
+        return QSize(int(size.width()) + 2 * PADDING, int(size.height()) + 2 * PADDING)
+
+    def paint(self, painter, option, index):
+        self.initStyleOption(option, index)
+        style = option.widget.style() if option.widget else self.view.style()
+        option.text = ""
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+        message = self.view.transcript.message(index.row())
+        measured = message["uid"] in self._layouts
+        static_text = self._layout(index, option.font)
+        painter.save()
+        painter.setFont(option.font)
+        painter.setPen(SENDER_COLORS.get(message["sender"], QColor("green")))
+        painter.drawStaticText(QPointF(option.rect.left() + PADDING, option.rect.top() + PADDING), static_text)
+        painter.restore()
+        if not measured and int(static_text.size().height()) + 2 * PADDING != option.rect.height():
+            self.sizeHintChanged.emit(index)  # The estimate was off: Qt relayouts the rows once painting is done
+
+
+class TranscriptView(QListView):
+    # Virtualized chat transcript: only visible messages are painted
+    older_requested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.transcript = TranscriptModel(self)
+        self.setModel(self.transcript)
+        self.message_delegate = MessageDelegate(self)
+        self.setItemDelegate(self.message_delegate)
+        self.transcript.modelReset.connect(self.message_delegate.clear_cache)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        self.verticalScrollBar().rangeChanged.connect(self._on_range_changed)
+        self._updating = False
+        self._pinned_to_bottom = True  # Kept at the bottom while painted rows replace their estimated heights
+
+        self.copy_action = QAction("Copy", self)
+        self.copy_action.setShortcut(QKeySequence.StandardKey.Copy)
+        self.copy_action.setShortcutContext(Qt.ShortcutContext.WidgetShortcut)
+        self.copy_action.triggered.connect(self.copy)
+        self.addAction(self.copy_action)
+
+    def _at_bottom(self):
+        scroll_bar = self.verticalScrollBar()
+        return scroll_bar.value() >= scroll_bar.maximum() - 4
+
+    def _on_range_changed(self, minimum, maximum):
+        if self._pinned_to_bottom:
+            self.verticalScrollBar().setValue(maximum)
+
+    def _on_scrolled(self, value):
+        self._pinned_to_bottom = self._at_bottom()
+        if value == self.verticalScrollBar().minimum() and self.transcript.has_older and not self._updating:
+            self.older_requested.emit()
+
+    def set_messages(self, entries, has_older=False):
+        self._updating = True
+        self.transcript.set_messages(entries, has_older)
+        self.scrollToBottom()
+        self._updating = False
+        if has_older and self.verticalScrollBar().maximum() == 0:
+            self.older_requested.emit()  # Everything loaded fits on screen: there is nothing to scroll
+
+    def prepend_messages(self, entries, has_older):
+        # Keep the message the user was looking at in place while older ones are inserted above it
+        scroll_bar = self.verticalScrollBar()
+        from_bottom = scroll_bar.maximum() - scroll_bar.value()
+        self._updating = True
+        self.transcript.prepend_messages(entries, has_older)
+        self.doItemsLayout()
+        scroll_bar.setValue(scroll_bar.maximum() - from_bottom)
+        self._updating = False
+
+    def append_message(self, sender, content, timestamp, cached=False):
+        at_bottom = self._at_bottom()
+        self.transcript.append_message(sender, content, timestamp, cached)
+        if at_bottom:
+            self.scrollToBottom()  # Auto-scroll
+
+    def append_to_last(self, text):
+        at_bottom = self._at_bottom()
+        self.transcript.append_to_last(text)
+        last = self.transcript.index(self.transcript.rowCount() - 1)
+        self.message_delegate.sizeHintChanged.emit(last)  # The message grew: relayout its row
+        if at_bottom:
+            self.scrollToBottom()
+
+    def scroll_to_row(self, row):
+        index = self.transcript.index(row)
+        if index.isValid():
+            self._pinned_to_bottom = False
+            self._scroll_to(QPersistentModelIndex(index))
+
+    def _scroll_to(self, index):
+        if not index.isValid():
+            return  # The chat was replaced meanwhile
+        if not self.visualRect(QModelIndex(index)).isValid():
+            QTimer.singleShot(0, lambda: self._scroll_to(index))  # The reset rows are laid out on the next event loop pass
+            return
+        self.scrollTo(QModelIndex(index), QAbstractItemView.ScrollHint.PositionAtTop)
+        self.setCurrentIndex(QModelIndex(index))
+
+    def copy(self):
+        rows = sorted(index.row() for index in self.selectedIndexes())
+        if rows:
+            QGuiApplication.clipboard().setText(
+                "\n".join(self.transcript.index(row).data(Qt.ItemDataRole.DisplayRole) for row in rows))
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+from chat_archive import chat_files, open_chat_file
+
+try:
+    import numpy as np
+except ImportError:  # Optional: without NumPy the app runs without semantic memory
+    np = None
+
+VECTOR_FILE = "vectors.f32"
+VECTOR_DB = "vectors.sqlite3"
+INITIAL_CAPACITY = 4096  # Rows; the matrix file doubles when it is full
+SNIPPET_LENGTH = 600  # Characters of each message kept for the prompt
+ADD_BATCH = 512
+
+MEMORY_HEADER = "Excerpts from earlier conversations that may be relevant (use them only if they help):"
+WORD = re.compile(r"\w+")
+
+
+def available():
+    return np is not None
+
+
+class HashingEmbedder:
+    # Deterministic offline embedding ("feature hashing"): words and word pairs are hashed into `dim`
+    # signed buckets, counts are log-scaled and each vector is L2-normalised. 64 dimensions keep a query
+    # over 200k messages (50 MB of float32) under 10 ms; the scan is bound by memory bandwidth.
+    # Any object with `name`, `dim` and embed(texts) -> float32 array of normalised rows can replace it.
+    def __init__(self, dim=64):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        words = WORD.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in Counter(self._features(text)).items():
+                value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                matrix[row, value % self.dim] += (1.0 + math.log(count)) * (1.0 if value >> 63 else -1.0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class VectorIndex:
+    # Embeddings of every stored message as one float32 matrix in a memory-mapped file (row = id in the
+    # SQLite table that locates the message); a query is a single matrix-vector product.
+    # Rows of deleted chats are zeroed, so they never match.
+    def __init__(self, directory, embedder=None, pattern="chat_history_*.jsonl"):
+        self.directory = directory
+        self.pattern = pattern
+        self.embedder = embedder or HashingEmbedder()
+        self._path = os.path.join(directory, VECTOR_FILE)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, VECTOR_DB), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "id INTEGER PRIMARY KEY, chat TEXT NOT NULL, position INTEGER NOT NULL, role TEXT, snippet TEXT)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS vectors_chat ON vectors (chat)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS indexed_chats (name TEXT PRIMARY KEY, message_count INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+        row = self._db.execute("SELECT value FROM settings WHERE key = 'embedder'").fetchone()
+        if row is None or row[0] != self.embedder.name:
+            # Vectors from another embedder can't be compared with this one's: start over
+            self._db.execute("DELETE FROM vectors")
+            self._db.execute("DELETE FROM indexed_chats")
+            self._db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('embedder', ?)",
+                             (self.embedder.name,))
+            if os.path.exists(self._path):
+                os.remove(self._path)
+        self._db.commit()
+        self._count = self._db.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM vectors").fetchone()[0]
+        self._matrix = None
+        self._map(self._count)
+
+    def _map(self, rows):
+        # (Re)maps the matrix file with room for at least `rows` rows; new rows read as zeros
+        row_bytes = self.embedder.dim * 4
+        size = os.path.getsize(self._path) if os.path.exists(self._path) else 0
+        if size < max(INITIAL_CAPACITY, rows) * row_bytes:
+            size = max(INITIAL_CAPACITY, rows) * row_bytes
+            with open(self._path, "ab") as file:
+                file.truncate(size)
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._matrix = np.memmap(self._path, dtype=np.float32, mode="r+", shape=(size // row_bytes, self.embedder.dim))
+
+    def _indexed_count(self, name):
+        row = self._db.execute("SELECT message_count FROM indexed_chats WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def add_messages(self, name, entries):
+        for i in range(0, len(entries), ADD_BATCH):
+            self._add(name, entries[i:i + ADD_BATCH])
+
+    def _add(self, name, entries):
+        texts = [entry.get("content", "") for entry in entries]
+        vectors = self.embedder.embed(texts)  # The slow part, done before taking the lock
+        with self._lock:
+            start = self._indexed_count(name)
+            kept = [i for i, text in enumerate(texts) if text.strip()]
+            first = self._count
+            if first + len(kept) > len(self._matrix):
+                self._map(2 * (first + len(kept)))
+            self._matrix[first:first + len(kept)] = vectors[kept]
+            self._matrix.flush()  # Vectors first: rows past the committed ids are simply overwritten later
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vectors (id, chat, position, role, snippet) VALUES (?, ?, ?, ?, ?)",
+                [(first + j, name, start + i, entries[i].get("role", ""), texts[i][:SNIPPET_LENGTH])
+                 for j, i in enumerate(kept)])
+            self._db.execute(
+                "INSERT OR REPLACE INTO indexed_chats (name, message_count) VALUES (?, ?)",
+                (name, start + len(entries)))
+            self._db.commit()
+            self._count = first + len(kept)
+
+    def remove_chat(self, name):
+        with self._lock:
+            ids = [row[0] for row in self._db.execute("SELECT id FROM vectors WHERE chat = ?", (name,))]
+            if ids:
+                self._matrix[ids] = 0
+                self._matrix.flush()
+            self._db.execute("DELETE FROM vectors WHERE chat = ?", (name,))
+            self._db.execute("DELETE FROM indexed_chats WHERE name = ?", (name,))
+            self._db.commit()
+
+    def reindex_chat(self, name, entries):
+        self.remove_chat(name)
+        self.add_messages(name, entries)
+
+    def catch_up(self, message_counts=None, limit=None):
+        # Embeds messages written while the index didn't exist, at most `limit` of them per call.
+        # Returns True if there is more to do. Archived chats are read from their compressed copies.
+        with self._lock:
+            indexed = dict(self._db.execute("SELECT name, message_count FROM indexed_chats"))
+        on_disk = set()
+        added = 0
+        for name, path in chat_files(self.directory, self.pattern):
+            on_disk.add(name)
+            skip = indexed.get(name, 0)
+            if message_counts is not None and message_counts.get(name) == skip:
+                continue
+            if limit is not None and added >= limit:
+                return True
+            entries = []
+            try:
+                with open_chat_file(path) as file:
+                    for line in file:
+                        if not line.strip():
+                            continue
+                        if skip:
+                            skip -= 1
+                            continue
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            pass
+                        if limit is not None and added + len(entries) >= limit:
+                            break
+            except FileNotFoundError:
+                continue  # Archived, restored or deleted since the listing; the next batch finds it
+            if entries:
+                self.add_messages(name, entries)
+                added += len(entries)
+        for name in indexed.keys() - on_disk:
+            if message_counts is None or name not in message_counts:
+                self.remove_chat(name)
+        return False
+
+    def search(self, text, k=4, exclude_chat=None, min_score=0.2):
+        # Returns [(score, chat, position, role, snippet)], most similar first
+        query = self.embedder.embed([text])[0]
+        if not query.any():
+            return []
+        with self._lock:
+            count = self._count
+            if count == 0:
+                return []
+            scores = self._matrix[:count] @ query  # Rows are normalised, so this is the cosine similarity
+            if exclude_chat is not None:
+                # Masked before picking the candidates, so the open chat's own messages can't crowd out the rest
+                excluded = [row[0] for row in self._db.execute(
+                    "SELECT id FROM vectors WHERE chat = ? AND id < ?", (exclude_chat, count))]
+                scores[excluded] = -np.inf
+            candidates = min(count, k)
+            top = np.argpartition(scores, count - candidates)[count - candidates:]
+            top = top[np.argsort(scores[top])[::-1]]
+            placeholders = ",".join("?" * len(top))
+            rows = {row[0]: row[1:] for row in self._db.execute(
+                f"SELECT id, chat, position, role, snippet FROM vectors WHERE id IN ({placeholders})",
+                [int(i) for i in top])}
+        results = []
+        for i in top:
+            score = float(scores[i])
+            row = rows.get(int(i))
+            if score < min_score:
+                break
+            if row is None:
+                continue
+            results.append((score, *row))
+            if len(results) == k:
+                break
+        return results
+
+    def close(self):
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._db.close()
+
+
+def add_memory(messages, hits):
+    # Returns the API messages with the retrieved excerpts added to the system prompt
+    if not hits:
+        return messages
+    lines = [MEMORY_HEADER]
+    for _, _, _, role, snippet in hits:
+        speaker = "User" if role in ("user", "You") else "Assistant"
+        lines.append(f"- {speaker}: {' '.join(snippet.split())}")
+    text = "\n".join(lines)
+    if messages and messages[0]["role"] == "system":
+        return [{"role": "system", "content": messages[0]["content"] + "\n\n" + text}] + messages[1:]
+    return [{"role": "system", "content": text}] + messages